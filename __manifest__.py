@@ -9,7 +9,7 @@
 
     'category': 'Human Resources',
     'license': 'OPL-1',
-    'version': '17.0.0.0.0',
+    'version': '17.0.1.0.0',
 
     'depends': ['base', 'web', 'mail'],
 
@@ -18,6 +18,8 @@
     # always loaded
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_config_parameter_data.xml',
+        'data/ir_cron_data.xml',
         'wizard/mass_reassign_physician_wizard_view.xml',
         'wizard/physician_disease_report_wizard_view.xml',
         'wizard/reschedule_appointment_wizard_views.xml',
@@ -30,8 +32,17 @@
         'views/disease.xml',
         'views/physician_change_history.xml',
         'views/physician_schedule.xml',
+        'views/schedule_template.xml',
+        'views/schedule_rollout.xml',
+        'views/patient_import.xml',
+        'views/patient_duplicate.xml',
         'reports/physician_disease_report.xml',
     ],
+    'assets': {
+        'web.assets_backend': [
+            'hr_hospital/static/src/**/*',
+        ],
+    },
     # only loaded in demonstration mode
     'demo': [],
 
@@ -0,0 +1,83 @@
+from odoo import fields, http
+from odoo.http import request
+
+# Models whose photos are served by the image route
+PERSON_MODELS = ('hr.hospital.patient', 'hr.hospital.physician')
+# Thumbnail sizes served, other requested sizes are rounded up to one
+IMAGE_SIZES = (64, 128, 256, 512, 1024, 1920)
+
+
+class HospitalController(http.Controller):
+
+    @http.route('/hr_hospital/next_available_slots', type='json', auth='user')
+    def next_available_slots(self, start=None, limit=10, physician_ids=None,
+                             specialty=None, window=None):
+        """Return the earliest free schedule slots, see
+        hr.hospital.physician.schedule.find_next_available_slots."""
+        return request.env[
+            'hr.hospital.physician.schedule'
+        ].find_next_available_slots(
+            start=fields.Datetime.to_datetime(start),
+            limit=max(1, min(int(limit), 100)),
+            physician_ids=physician_ids,
+            specialty=specialty,
+            window=window,
+        )
+
+    @http.route('/hr_hospital/book_slot', type='json', auth='user')
+    def book_slot(self, physician_id, patient_id, appointment_date,
+                  appointment_time, fallback=False, notes=False):
+        """Book a visit, see hr.hospital.patient.visits.book_slot."""
+        return request.env['hr.hospital.patient.visits'].book_slot(
+            int(physician_id),
+            int(patient_id),
+            appointment_date,
+            float(appointment_time),
+            fallback=bool(fallback),
+            notes=notes,
+        )
+
+    @http.route('/hr_hospital/patient_timeline', type='json', auth='user')
+    def patient_timeline(self, patient_id, limit=50, cursor=None):
+        """Return a page of a patient's history, see
+        hr.hospital.patient.get_timeline."""
+        return request.env['hr.hospital.patient'].browse(
+            int(patient_id)).get_timeline(
+                limit=max(1, min(int(limit), 200)), cursor=cursor)
+
+    @http.route('/hr_hospital/caller_id', type='json', auth='user')
+    def caller_id(self, phone, limit=10):
+        """Return the patients and physicians a phone number belongs to."""
+        limit = max(1, min(int(limit), 100))
+        return {
+            model: [
+                {'id': person.id, 'name': person.display_name}
+                for person in request.env[model].find_by_phone(
+                    phone, limit=limit)
+            ]
+            for model in PERSON_MODELS
+        }
+
+    @http.route(['/hr_hospital/image/<string:model>/<int:record_id>',
+                 '/hr_hospital/image/<string:model>/<int:record_id>/'
+                 '<int:size>'], type='http', auth='user')
+    def person_image(self, model, record_id, size=128, unique=None):
+        """Serve the photo of a patient or physician resized to size.
+
+        Thumbnails are generated from the photo on the first request
+        instead of being stored. Responses carry an ETag and Last-Modified
+        header, and are cached for good when the URL holds the checksum of
+        the photo in ``unique``.
+        """
+        if model not in PERSON_MODELS:
+            raise request.not_found()
+        record = request.env[model].browse(record_id).exists()
+        if not record:
+            raise request.not_found()
+        record.check_access_rights('read')
+        record.check_access_rule('read')
+
+        size = next((s for s in IMAGE_SIZES if s >= size), IMAGE_SIZES[-1])
+        stream = request.env['ir.binary']._get_image_stream_from(
+            record, 'image_1920', width=size, height=size)
+        return stream.get_response(immutable=bool(unique))
@@ -0,0 +1,65 @@
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Fill the stored slot availability and the physician day bitmaps,
+    and remove the stored thumbnails.
+
+    The new availability columns start out available with no visits, so
+    only the slots holding active visits are recounted. The physician day
+    rows are built with one aggregated INSERT. image_128 is now resized on
+    demand, so its attachments are no longer needed.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    cr.execute("""
+        SELECT DISTINCT physician_id, appointment_date, appointment_minute
+        FROM hr_hospital_patient_visits
+        WHERE state NOT IN ('cancelled', 'no_show')
+    """)
+    slot_keys = set(cr.fetchall())
+    env['hr.hospital.physician.schedule']._refresh_availability(slot_keys)
+    _logger.info('Refreshed the availability of %s booked slots',
+                 len(slot_keys))
+
+    cr.execute("""
+        INSERT INTO hr_hospital_physician_day (
+            physician_id, day, slot_mask, booked_mask,
+            create_uid, create_date, write_uid, write_date
+        )
+        SELECT physician_id, day, bit_or(slot_bit), bit_or(booked_bit),
+               %(uid)s, NOW() AT TIME ZONE 'UTC',
+               %(uid)s, NOW() AT TIME ZONE 'UTC'
+        FROM (
+            SELECT physician_id, appointment_date AS day,
+                   1 << ((appointment_minute - 480) / 30) AS slot_bit,
+                   0 AS booked_bit
+            FROM hr_hospital_physician_schedule
+            WHERE appointment_minute BETWEEN 480 AND 1050
+            AND appointment_minute %% 30 = 0
+            UNION ALL
+            SELECT physician_id, appointment_date,
+                   0, 1 << ((appointment_minute - 480) / 30)
+            FROM hr_hospital_patient_visits
+            WHERE state NOT IN ('cancelled', 'no_show')
+            AND physician_id IS NOT NULL
+            AND appointment_date IS NOT NULL
+            AND appointment_minute BETWEEN 480 AND 1050
+            AND appointment_minute %% 30 = 0
+        ) AS bits
+        GROUP BY physician_id, day
+        ON CONFLICT (physician_id, day) DO UPDATE SET
+            slot_mask = EXCLUDED.slot_mask,
+            booked_mask = EXCLUDED.booked_mask
+    """, {'uid': SUPERUSER_ID})
+    _logger.info('Built %s physician day bitmaps', cr.rowcount)
+
+    attachments = env['ir.attachment'].search([
+        ('res_model', 'in', ['hr.hospital.patient', 'hr.hospital.physician']),
+        ('res_field', '=', 'image_128'),
+    ])
+    attachments.unlink()
+    _logger.info('Removed %s stored thumbnails', len(attachments))
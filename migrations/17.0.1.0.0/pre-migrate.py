@@ -0,0 +1,65 @@
+import logging
+
+from odoo.tools.sql import column_exists, create_column
+
+_logger = logging.getLogger(__name__)
+
+
+def _backfill_column(cr, table, column, column_type, query, params=None):
+    """Create the column and fill it with one UPDATE, so the ORM does not
+    recompute it record by record when the field is added."""
+    if column_exists(cr, table, column):
+        return
+    create_column(cr, table, column, column_type)
+    cr.execute(query.format(table=table, column=column), params)
+    _logger.info('Back-filled %s of %s rows in %s',
+                 column, cr.rowcount, table)
+
+
+def migrate(cr, version):
+    """Prepare the tables of the 17.0.0.0.0 module for the new fields.
+
+    - appointment_minute is filled from the float appointment_time
+    - phone_normalized and mobile_normalized keep the digits of the numbers
+    - image_checksum is copied from the checksums of the photo attachments
+    - the B-tree indexes of the name fields are dropped so the registry
+      recreates them as trigram indexes, the index names being the same
+      for both methods
+    - the unique physician and datetime constraint is dropped, cancelled
+      visits used to block their slot forever; the partial unique indexes
+      of active visits replace it
+    """
+    for table in ('hr_hospital_physician_schedule',
+                  'hr_hospital_patient_visits'):
+        _backfill_column(cr, table, 'appointment_minute', 'int4', """
+            UPDATE {table}
+            SET {column} = round(appointment_time * 60)::int
+        """)
+
+    for table, model in (('hr_hospital_patient', 'hr.hospital.patient'),
+                         ('hr_hospital_physician', 'hr.hospital.physician')):
+        for source in ('phone', 'mobile'):
+            _backfill_column(
+                cr, table, '%s_normalized' % source, 'varchar', """
+                    UPDATE {table}
+                    SET {column} = NULLIF(
+                        regexp_replace(%s, '\\D', '', 'g'), '')
+                    WHERE %s IS NOT NULL
+                """ % (source, source))
+        _backfill_column(cr, table, 'image_checksum', 'varchar', """
+            UPDATE {table} person
+            SET {column} = attachment.checksum
+            FROM ir_attachment attachment
+            WHERE attachment.res_model = %s
+            AND attachment.res_field = 'image_1920'
+            AND attachment.res_id = person.id
+        """, (model,))
+        for column in ('name_first', 'name_last', 'display_name'):
+            cr.execute('DROP INDEX IF EXISTS {table}__{column}_index'.format(
+                table=table, column=column))
+
+    cr.execute("""
+        ALTER TABLE hr_hospital_patient_visits
+        DROP CONSTRAINT IF EXISTS
+            hr_hospital_patient_visits_unique_physician_datetime
+    """)
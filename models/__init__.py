@@ -6,6 +6,12 @@ from . import physician
 from . import disease
 from . import diagnosis
 from . import time_validation_mixin
+from . import shift_pattern_mixin
 from . import physician_schedule
 from . import patient_visits
+from . import physician_day
 from . import physician_change_history
+from . import schedule_rollout
+from . import schedule_template
+from . import patient_import
+from . import patient_duplicate
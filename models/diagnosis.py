@@ -2,6 +2,7 @@ import logging
 
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
 
 _logger = logging.getLogger(__name__)
 
@@ -42,6 +43,14 @@ class Diagnosis(models.Model):
         ('final', 'Final')
     ], string='Status', default='draft', required=True)
 
+    def init(self):
+        # Serves the pages of the patient timeline
+        create_index(
+            self.env.cr,
+            'hr_hospital_diagnosis_timeline_index',
+            self._table,
+            ['patient_id', 'date_of_diagnosis', 'id'])
+
     @api.depends('physician', 'physician.is_intern')
     def _compute_needs_mentor_review(self):
         for record in self:
@@ -1,11 +1,44 @@
+import calendar
 import logging
-from datetime import date
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
 from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
 
 _logger = logging.getLogger(__name__)
 
+# Month and day of birth as MMDD, indexed to find the day's birthdays
+BIRTHDAY_EXPRESSION = (
+    '(EXTRACT(MONTH FROM date_of_birth) * 100 '
+    '+ EXTRACT(DAY FROM date_of_birth))'
+)
+
+# Sources of the patient timeline: event type, model, table, time of the
+# event, indexed date column and its type, order served by the
+# (patient_id, ...) timeline index, and the physician, state and disease
+# columns
+TIMELINE_SOURCES = [
+    ('visit', 'hr.hospital.patient.visits', 'hr_hospital_patient_visits',
+     "appointment_date + appointment_minute * interval '1 minute'",
+     'appointment_date', 'date',
+     'appointment_date DESC, appointment_minute DESC, id DESC',
+     'physician_id, state, NULL::int'),
+    ('diagnosis', 'hr.hospital.diagnosis', 'hr_hospital_diagnosis',
+     'date_of_diagnosis::timestamp',
+     'date_of_diagnosis', 'date',
+     'date_of_diagnosis DESC, id DESC',
+     'physician, state, disease_id'),
+    ('physician_change', 'hr.hospital.physician.change.history',
+     'hr_hospital_physician_change_history',
+     'date_established',
+     'date_established', 'timestamp',
+     'date_established DESC, id DESC',
+     'physician_id, NULL::varchar, NULL::int'),
+]
+TIMELINE_PAGE_SIZE = 50
+
 
 class Patient(models.Model):
     _name = 'hr.hospital.patient'
@@ -44,6 +77,7 @@ class Patient(models.Model):
     next_appointment_date = fields.Date(
         compute='_compute_next_appointment',
         store=True,
+        index=True,
         string='Next Appointment Date'
     )
     next_appointment_time = fields.Float(
@@ -52,6 +86,38 @@ class Patient(models.Model):
         string='Next Appointment Time'
     )
 
+    def init(self):
+        super().init()
+        create_index(
+            self.env.cr,
+            'hr_hospital_patient_birthday_index',
+            self._table,
+            [BIRTHDAY_EXPRESSION])
+        # Serve the identity matching of imports
+        create_index(
+            self.env.cr,
+            'hr_hospital_patient_passport_index',
+            self._table,
+            ['passport_details'])
+        create_index(
+            self.env.cr,
+            'hr_hospital_patient_identity_index',
+            self._table,
+            ['date_of_birth', 'lower(name_last)', 'lower(name_first)'])
+        # Serves the default list order, the name fields having trigram
+        # indexes that cannot sort
+        create_index(
+            self.env.cr,
+            'hr_hospital_patient_name_order_index',
+            self._table,
+            ['name_last', 'name_first'])
+        # Serves the incremental scan of the duplicate detection
+        create_index(
+            self.env.cr,
+            'hr_hospital_patient_write_date_index',
+            self._table,
+            ['write_date', 'id'])
+
     @api.depends('date_of_birth')
     def _compute_age(self):
         """Compute patient age based on date of birth."""
@@ -68,16 +134,233 @@ class Patient(models.Model):
             else:
                 rec.age = False
 
-    @api.depends('visit_ids', 'visit_ids.appointment_date', 'visit_ids.appointment_time', 'visit_ids.state')
+    @api.depends('visit_ids', 'visit_ids.appointment_date', 'visit_ids.appointment_minute', 'visit_ids.state')
     def _compute_next_appointment(self):
-        """Compute the next scheduled appointment."""
+        """Compute the next scheduled appointment.
+
+        The earliest upcoming scheduled visit of every patient in the
+        recordset is fetched with one DISTINCT ON query, instead of loading
+        each patient's whole visit history.
+        """
+        patient_ids = [patient._origin.id for patient in self
+                       if patient._origin.id]
+        next_visits = {}
+        if patient_ids:
+            self.env['hr.hospital.patient.visits'].flush_model([
+                'patient_id', 'appointment_date', 'appointment_time',
+                'appointment_minute', 'state'])
+            self.env.cr.execute("""
+                SELECT DISTINCT ON (patient_id)
+                       patient_id, appointment_date, appointment_time
+                FROM hr_hospital_patient_visits
+                WHERE patient_id = ANY(%s)
+                AND state = 'scheduled'
+                AND appointment_date >= %s
+                ORDER BY patient_id, appointment_date, appointment_minute
+            """, (patient_ids, fields.Date.today()))
+            next_visits = {
+                patient_id: (appointment_date, appointment_time)
+                for patient_id, appointment_date, appointment_time
+                in self.env.cr.fetchall()
+            }
+
         for patient in self:
-            next_visit = patient.visit_ids.filtered(
-                lambda v: v.state == 'scheduled' and v.appointment_date >= fields.Date.today()
-            ).sorted(lambda v: (v.appointment_date, v.appointment_time))[:1]
-            
-            patient.next_appointment_date = next_visit.appointment_date if next_visit else False
-            patient.next_appointment_time = next_visit.appointment_time if next_visit else False
+            patient.next_appointment_date, patient.next_appointment_time = \
+                next_visits.get(patient._origin.id, (False, False))
+
+    @api.model
+    def _get_birthdays_since(self, date_from, date_to):
+        """Return the MMDD birthdays of the days in (date_from, date_to].
+
+        February 29 is included with February 28 or March 1 of non-leap
+        years, when those patients' ages change.
+        """
+        birthdays = set()
+        current_date = date_from + timedelta(days=1)
+        while current_date <= date_to:
+            birthdays.add(current_date.month * 100 + current_date.day)
+            if not calendar.isleap(current_date.year) and \
+                    (current_date.month, current_date.day) in ((2, 28), (3, 1)):
+                birthdays.add(229)
+            current_date += timedelta(days=1)
+        return birthdays
+
+    @api.model
+    def _cron_refresh_age(self, today=None):
+        """Update the stored age of patients who had a birthday.
+
+        Ages only depend on date_of_birth for the ORM, so they go stale on
+        every birthday. This job looks up the patients born on the days
+        since its last run through the indexed month and day of birth and
+        updates their age with one UPDATE. Without a previous run recorded
+        in hr_hospital.age_refreshed_until, every age is recomputed once.
+
+        Args:
+            today (date): Day to refresh ages for, defaults to today
+
+        Returns:
+            int: Number of patients whose age changed
+        """
+        today = today or fields.Date.today()
+        params = self.env['ir.config_parameter'].sudo()
+        last_run = fields.Date.to_date(params.get_param(
+            'hr_hospital.age_refreshed_until'))
+        if last_run and last_run >= today:
+            return 0
+
+        # Past a year of missed runs, every birthday is due anyway
+        condition = ''
+        query_params = {'today': today}
+        if last_run and (today - last_run).days < 366:
+            condition = 'AND {} = ANY(%(birthdays)s)'.format(
+                BIRTHDAY_EXPRESSION)
+            query_params['birthdays'] = sorted(
+                self._get_birthdays_since(last_run, today))
+
+        self.flush_model(['date_of_birth', 'age'])
+        self.env.cr.execute("""
+            UPDATE hr_hospital_patient
+            SET age = {age}
+            WHERE date_of_birth IS NOT NULL
+            {condition}
+            AND age IS DISTINCT FROM {age}
+        """.format(condition=condition, age=(
+            'EXTRACT(YEAR FROM age('
+            '%(today)s::timestamp, date_of_birth::timestamp))')),
+            query_params)
+        count = self.env.cr.rowcount
+        self.invalidate_model(['age'])
+
+        params.set_param(
+            'hr_hospital.age_refreshed_until', fields.Date.to_string(today))
+        _logger.info('Refreshed the age of %s patients', count)
+        return count
+
+    @api.model
+    def _cron_refresh_next_appointment(self):
+        """Recompute next appointments that fell into the past.
+
+        The stored values only change with the visits, so a patient whose
+        next appointment day has passed keeps it until this nightly
+        refresh. Only those patients are recomputed.
+
+        Returns:
+            int: Number of refreshed patients
+        """
+        patients = self.with_context(active_test=False).search([
+            ('next_appointment_date', '<', fields.Date.today()),
+        ])
+        if patients:
+            for field_name in ('next_appointment_date', 'next_appointment_time'):
+                self.env.add_to_compute(self._fields[field_name], patients)
+            patients.flush_recordset([
+                'next_appointment_date', 'next_appointment_time'])
+        _logger.info('Refreshed the next appointment of %s patients',
+                     len(patients))
+        return len(patients)
+
+    def get_timeline(self, limit=TIMELINE_PAGE_SIZE, cursor=None):
+        """Return a page of the patient's visits, diagnoses and physician
+        changes, newest first.
+
+        The sources are merged with one UNION ALL query. Each branch reads
+        at most one page from its (patient_id, date, ...) index, starting
+        after the cursor, so any page costs the same however long the
+        history is. Events are ordered by (date, type, id), the type
+        breaking ties between ids of different tables.
+
+        Args:
+            limit (int): Number of events per page
+            cursor (str): next_cursor of the previous page, None for the
+                newest events
+
+        Returns:
+            dict: events, and next_cursor, False on the last page
+
+        Raises:
+            ValidationError: If the cursor is malformed
+        """
+        self.ensure_one()
+        self.check_access_rights('read')
+        self.check_access_rule('read')
+        params = {'patient_id': self.id, 'limit': limit + 1}
+        if cursor:
+            try:
+                cursor_at, cursor_type, cursor_id = cursor.split('|')
+                params.update(cursor_at=datetime.fromisoformat(cursor_at),
+                              cursor_type=cursor_type,
+                              cursor_id=int(cursor_id))
+            except ValueError as e:
+                raise ValidationError(_(
+                    'Invalid timeline cursor: %(cursor)s') % {
+                        'cursor': cursor}) from e
+
+        branches = []
+        for event_type, model, table, event_at, date_column, date_type, \
+                order, columns in TIMELINE_SOURCES:
+            self.env[model].check_access_rights('read')
+            self.env[model].flush_model()
+            condition = ''
+            if cursor:
+                condition = """
+                    AND {date_column} <= %(cursor_at)s::{date_type}
+                    AND ({event_at}, '{event_type}', id)
+                        < (%(cursor_at)s, %(cursor_type)s, %(cursor_id)s)
+                """.format(date_column=date_column, date_type=date_type,
+                           event_at=event_at, event_type=event_type)
+            branches.append("""(
+                SELECT '{event_type}' AS event_type, id, {event_at} AS event_at,
+                       {columns}
+                FROM {table}
+                WHERE patient_id = %(patient_id)s
+                {condition}
+                ORDER BY {order}
+                LIMIT %(limit)s
+            )""".format(event_type=event_type, event_at=event_at,
+                       columns=columns, table=table, condition=condition,
+                       order=order))
+
+        self.env.cr.execute("""
+            SELECT * FROM ({branches}) timeline
+            ORDER BY event_at DESC, event_type DESC, id DESC
+            LIMIT %(limit)s
+        """.format(branches=' UNION ALL '.join(branches)), params)
+        rows = self.env.cr.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        physicians = self.env['hr.hospital.physician'].browse(
+            {row[3] for row in rows if row[3]})
+        diseases = self.env['hr.hospital.disease'].browse(
+            {row[5] for row in rows if row[5]})
+        physician_names = dict(zip(physicians.ids,
+                                   physicians.mapped('display_name')))
+        disease_names = dict(zip(diseases.ids, diseases.mapped('name')))
+        state_labels = {
+            event_type: dict(self.env[model]._fields['state']
+                             ._description_selection(self.env))
+            for event_type, model, *_rest in TIMELINE_SOURCES
+            if 'state' in self.env[model]._fields
+        }
+
+        events = [{
+            'type': event_type,
+            'id': record_id,
+            'date': fields.Datetime.to_string(event_at),
+            'physician_id': physician_id,
+            'physician': physician_names.get(physician_id, False),
+            'state': state or False,
+            'state_label': state_labels.get(event_type, {}).get(state, False),
+            'disease_id': disease_id,
+            'disease': disease_names.get(disease_id, False),
+        } for event_type, record_id, event_at, physician_id, state, disease_id
+            in rows]
+        next_cursor = False
+        if has_more:
+            last = rows[-1]
+            next_cursor = '%s|%s|%s' % (
+                last[2].isoformat(sep=' '), last[0], last[1])
+        return {'events': events, 'next_cursor': next_cursor}
 
     def action_view_visits(self):
         """Open the visits view for this patient."""
@@ -91,25 +374,31 @@ class Patient(models.Model):
             'context': {'default_patient_id': self.id},
         }
 
+    def _log_physician_changes(self):
+        """Record the current personal physician of these patients in the
+        change history with one batched create."""
+        now = fields.Datetime.now()
+        self.env['hr.hospital.physician.change.history'].create([{
+            'date_established': now,
+            'patient_id': patient.id,
+            'physician_id': patient.personal_physician.id,
+        } for patient in self if patient.personal_physician])
+
     def write(self, vals):
         """Override write to track physician changes."""
+        changed = self.browse()
         if 'personal_physician' in vals:
-            self.env['hr.hospital.physician.change.history'].create({
-                'date_established': fields.Datetime.now(),
-                'patient_id': self.id,
-                'physician_id': vals['personal_physician'],
-            })
-        return super().write(vals)
+            # Only patients whose physician actually changes get history
+            changed = self.filtered(
+                lambda p: p.personal_physician.id != (
+                    vals['personal_physician'] or False))
+        res = super().write(vals)
+        changed._log_physician_changes()
+        return res
 
     @api.model_create_multi
     def create(self, vals_list):
         """Override create to track initial physician assignment."""
         records = super().create(vals_list)
-        for record in records:
-            if record.personal_physician:
-                self.env['hr.hospital.physician.change.history'].create({
-                    'date_established': fields.Datetime.now(),
-                    'patient_id': record.id,
-                    'physician_id': record.personal_physician.id,
-                })
+        records._log_physician_changes()
         return records
@@ -0,0 +1,326 @@
+import logging
+import unicodedata
+from difflib import SequenceMatcher
+
+from psycopg2.errors import UniqueViolation
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+from .person import normalize_phone
+
+_logger = logging.getLogger(__name__)
+
+# Weights of the compared attributes in the duplicate score
+SCORE_WEIGHTS = {
+    'name': 0.5,
+    'phone': 0.15,
+    'email': 0.15,
+    'passport': 0.2,
+}
+# Length of the normalized name prefixes that candidates must share
+NAME_PREFIX_LENGTH = 3
+
+
+def normalize_name(value):
+    """Lower-case a name and strip accents, spaces and punctuation."""
+    value = unicodedata.normalize('NFKD', value or '')
+    return ''.join(char for char in value if char.isalnum()).lower()
+
+
+class PatientDuplicate(models.Model):
+    _name = 'hr.hospital.patient.duplicate'
+    _description = 'Duplicate Patient Candidate'
+    _order = 'state, score desc, id'
+    _sql_constraints = [
+        ('unique_patient_pair',
+         'UNIQUE(patient_id, duplicate_id)',
+         'This pair of patients is already a duplicate candidate!'),
+        ('ordered_patient_pair',
+         'CHECK(patient_id < duplicate_id)',
+         'The kept patient must be the older record of the pair!'),
+    ]
+
+    patient_id = fields.Many2one(
+        'hr.hospital.patient',
+        string='Patient',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        help='Older record of the pair, kept when merging'
+    )
+    duplicate_id = fields.Many2one(
+        'hr.hospital.patient',
+        string='Duplicate',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        help='Newer record of the pair, archived when merging'
+    )
+    score = fields.Float(
+        digits=(3, 2),
+        help='Similarity between 0 and 1'
+    )
+    reasons = fields.Char(help='Attributes the two patients share')
+    state = fields.Selection([
+        ('pending', 'To Review'),
+        ('merged', 'Merged'),
+        ('dismissed', 'Not a Duplicate'),
+    ], string='Status', default='pending', required=True, index=True)
+
+    @api.model
+    def _get_blocking_keys(self, patient):
+        """Return the (date of birth, name prefix) groups of a patient row.
+
+        Only patients sharing a group are compared, so a typo in either
+        the first or the last name still leaves one shared group.
+        """
+        return {
+            (patient['date_of_birth'], part, normalize_name(
+                patient[field_name])[:NAME_PREFIX_LENGTH])
+            for part, field_name in (('first', 'name_first'),
+                                     ('last', 'name_last'))
+        }
+
+    @api.model
+    def _score_pair(self, patient, other):
+        """Score the similarity of two patient rows.
+
+        Returns:
+            tuple: (score, reasons), with a score of 0 for patients whose
+            passports differ
+        """
+        passport, other_passport = (
+            (row['passport_details'] or '').strip().upper()
+            for row in (patient, other))
+        if passport and other_passport and passport != other_passport:
+            return 0.0, []
+
+        reasons = []
+        name_ratio = SequenceMatcher(
+            None,
+            normalize_name(patient['name_first'] + patient['name_last']),
+            normalize_name(other['name_first'] + other['name_last']),
+        ).ratio()
+        score = SCORE_WEIGHTS['name'] * name_ratio
+        if name_ratio == 1:
+            reasons.append(_('name'))
+
+        phones = {normalize_phone(patient[f]) for f in ('phone', 'mobile')}
+        other_phones = {normalize_phone(other[f]) for f in ('phone', 'mobile')}
+        if (phones & other_phones) - {''}:
+            score += SCORE_WEIGHTS['phone']
+            reasons.append(_('phone'))
+        if patient['email'] and \
+                patient['email'].strip().lower() == \
+                (other['email'] or '').strip().lower():
+            score += SCORE_WEIGHTS['email']
+            reasons.append(_('email'))
+        if passport and passport == other_passport:
+            score += SCORE_WEIGHTS['passport']
+            reasons.append(_('passport'))
+        return score, reasons
+
+    @api.model
+    def _get_min_score(self):
+        return float(self.env['ir.config_parameter'].sudo().get_param(
+            'hr_hospital.duplicate_min_score', 0.45))
+
+    @api.model
+    def _cron_detect_duplicates(self, batch_size=1000):
+        """Look for duplicates of patients created or changed since the
+        last run.
+
+        Changed patients are read in (write_date, id) order from the cursor
+        kept in the hr_hospital.duplicate_scan_cursor parameter. Each batch
+        fetches the patients born on the same days with one query, compares
+        only those sharing a normalized name prefix, and stores the pairs
+        above hr_hospital.duplicate_min_score for review. The cron is
+        re-triggered while changed patients remain.
+
+        Returns:
+            int: Number of new or updated candidate pairs
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        cursor = params.get_param('hr_hospital.duplicate_scan_cursor')
+        last_date, last_id = cursor.split('|') if cursor else (None, 0)
+        Patient = self.env['hr.hospital.patient']
+        Patient.flush_model()
+
+        self.env.cr.execute("""
+            SELECT id, write_date, date_of_birth
+            FROM hr_hospital_patient
+            WHERE (%(last_date)s::timestamp IS NULL
+                   OR (write_date, id) > (%(last_date)s, %(last_id)s))
+            ORDER BY write_date, id
+            LIMIT %(limit)s
+        """, {'last_date': last_date, 'last_id': int(last_id),
+              'limit': batch_size})
+        changed = self.env.cr.fetchall()
+        if not changed:
+            return 0
+
+        changed_ids = {patient_id for patient_id, _date, birth in changed
+                       if birth}
+        birth_dates = list({birth for _id, _date, birth in changed if birth})
+        self.env.cr.execute("""
+            SELECT id, name_first, name_last, date_of_birth, phone, mobile,
+                   email, passport_details
+            FROM hr_hospital_patient
+            WHERE date_of_birth = ANY(%s) AND active
+        """, (birth_dates,))
+        blocks = {}
+        patients = {}
+        for patient in self.env.cr.dictfetchall():
+            patients[patient['id']] = patient
+            for key in self._get_blocking_keys(patient):
+                blocks.setdefault(key, set()).add(patient['id'])
+
+        min_score = self._get_min_score()
+        candidates = {}
+        for block in blocks.values():
+            for patient_id in block & changed_ids:
+                for other_id in block - {patient_id}:
+                    pair = tuple(sorted((patient_id, other_id)))
+                    if pair in candidates:
+                        continue
+                    score, reasons = self._score_pair(
+                        patients[pair[0]], patients[pair[1]])
+                    if score >= min_score:
+                        candidates[pair] = (score, reasons)
+
+        count = self._store_candidates(candidates)
+        last_date, last_id = changed[-1][1], changed[-1][0]
+        # Keep the microseconds, write dates of a batch often share a second
+        params.set_param('hr_hospital.duplicate_scan_cursor', '%s|%s' % (
+            last_date.isoformat(sep=' '), last_id))
+        _logger.info(
+            'Duplicate scan: %s changed patients, %s candidate pairs',
+            len(changed), count)
+        if len(changed) == batch_size:
+            self.env.ref('hr_hospital.ir_cron_detect_duplicates')._trigger()
+        return count
+
+    @api.model
+    def _store_candidates(self, candidates):
+        """Create or refresh the candidate pairs, keeping reviewed ones."""
+        if not candidates:
+            return 0
+        existing = {
+            (pair.patient_id.id, pair.duplicate_id.id): pair
+            for pair in self.search([
+                ('patient_id', 'in', [p for p, _d in candidates]),
+                ('duplicate_id', 'in', [d for _p, d in candidates]),
+            ])
+        }
+        vals_list = []
+        count = 0
+        for (patient_id, duplicate_id), (score, reasons) in candidates.items():
+            vals = {'score': score, 'reasons': ', '.join(reasons)}
+            pair = existing.get((patient_id, duplicate_id))
+            if not pair:
+                vals_list.append(dict(
+                    vals, patient_id=patient_id, duplicate_id=duplicate_id))
+            elif pair.state == 'pending':
+                pair.write(vals)
+            else:
+                continue
+            count += 1
+        self.create(vals_list)
+        return count
+
+    def action_dismiss(self):
+        self.write({'state': 'dismissed'})
+        return True
+
+    def action_merge(self):
+        """Merge each duplicate into the kept patient of its pair.
+
+        Every stored reference to the duplicate, such as visits, diagnoses
+        and physician history, is re-pointed with one UPDATE per column,
+        its chatter is moved to the kept patient and the duplicate is
+        archived.
+        """
+        for pair in self.filtered(lambda p: p.state == 'pending'):
+            master, duplicate = pair.patient_id, pair.duplicate_id
+            try:
+                with self.env.cr.savepoint():
+                    pair._repoint_references(duplicate, master)
+            except UniqueViolation as e:
+                raise ValidationError(_(
+                    '%(duplicate)s cannot be merged into %(patient)s, both '
+                    'have an appointment on the same day.') % {
+                        'duplicate': duplicate.display_name,
+                        'patient': master.display_name,
+                    }) from e
+            # Keep the duplicate's data where the kept patient has none
+            master.write({
+                field_name: duplicate[field_name]
+                for field_name in ('date_of_birth', 'passport_details',
+                                   'contact_person', 'phone', 'mobile',
+                                   'email', 'personal_physician')
+                if not master[field_name] and duplicate[field_name]
+            })
+            duplicate.active = False
+            master.message_post(body=_(
+                'Merged duplicate patient %(name)s (ID %(id)s)') % {
+                    'name': duplicate.display_name, 'id': duplicate.id})
+            pair.state = 'merged'
+            self.search([
+                ('state', '=', 'pending'),
+                '|', ('patient_id', '=', duplicate.id),
+                ('duplicate_id', '=', duplicate.id),
+            ]).unlink()
+        return True
+
+    def _repoint_references(self, duplicate, master):
+        """Move every stored reference from duplicate to master."""
+        self.env.flush_all()
+        cr = self.env.cr
+        for model in self.env.registry.values():
+            if model._abstract or model._transient or not model._auto \
+                    or model._name == self._name:
+                continue
+            for field in model._fields.values():
+                if not field.store or field.inherited:
+                    continue
+                if field.type == 'many2one' and \
+                        field.comodel_name == 'hr.hospital.patient':
+                    cr.execute(
+                        'UPDATE "{table}" SET "{column}" = %s '
+                        'WHERE "{column}" = %s'.format(
+                            table=model._table, column=field.name),
+                        (master.id, duplicate.id))
+                elif field.type == 'many2many' and \
+                        'hr.hospital.patient' in (model._name,
+                                                  field.comodel_name):
+                    column = field.column1 \
+                        if model._name == 'hr.hospital.patient' \
+                        else field.column2
+                    other = field.column2 \
+                        if column == field.column1 else field.column1
+                    cr.execute("""
+                        UPDATE "{table}" rel SET "{column}" = %(master)s
+                        WHERE "{column}" = %(duplicate)s
+                        AND NOT EXISTS (
+                            SELECT 1 FROM "{table}" kept
+                            WHERE kept."{column}" = %(master)s
+                            AND kept."{other}" = rel."{other}")
+                    """.format(table=field.relation, column=column,
+                               other=other),
+                        {'master': master.id, 'duplicate': duplicate.id})
+                    cr.execute(
+                        'DELETE FROM "{table}" WHERE "{column}" = %s'.format(
+                            table=field.relation, column=column),
+                        (duplicate.id,))
+        cr.execute("""
+            UPDATE mail_message SET res_id = %s
+            WHERE model = 'hr.hospital.patient' AND res_id = %s
+        """, (master.id, duplicate.id))
+        self.env.invalidate_all()
+
+        # Visits moved to the kept patient change its next appointment
+        Patient = self.env['hr.hospital.patient']
+        for field_name in ('next_appointment_date', 'next_appointment_time'):
+            self.env.add_to_compute(Patient._fields[field_name],
+                                    master | duplicate)
@@ -0,0 +1,303 @@
+import csv
+import io
+import itertools
+import json
+import logging
+import threading
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+from .person import BULK_IMPORT_CONTEXT
+
+_logger = logging.getLogger(__name__)
+
+# Patient fields that can be imported, keyed by their column name
+IMPORT_FIELDS = (
+    'name_first', 'name_last', 'gender', 'date_of_birth',
+    'passport_details', 'contact_person', 'phone', 'mobile', 'email',
+)
+GENDERS = ('male', 'female', 'other')
+# Only the first errors are kept in the log, the count covers all of them
+MAX_LOGGED_ERRORS = 200
+
+
+class PatientImport(models.Model):
+    _name = 'hr.hospital.patient.import'
+    _description = 'Patient Import'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(required=True)
+    import_file = fields.Binary(
+        string='File',
+        required=True,
+        attachment=True
+    )
+    file_name = fields.Char()
+    file_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ], string='Format', required=True, default='csv',
+        help='CSV files need a header row with the patient field names; '
+        'JSON Lines files hold one patient object per line')
+    chunk_size = fields.Integer(
+        default=1000,
+        required=True,
+        help='Number of rows validated, matched and committed together'
+    )
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('queued', 'Queued'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='draft', required=True, index=True)
+    rows_processed = fields.Integer(
+        readonly=True,
+        help='Rows already committed, the import resumes after them'
+    )
+    created_count = fields.Integer(string='Created', readonly=True)
+    updated_count = fields.Integer(string='Updated', readonly=True)
+    error_count = fields.Integer(string='Errors', readonly=True)
+    error_log = fields.Text(readonly=True)
+
+    @api.constrains('chunk_size')
+    def _check_chunk_size(self):
+        for record in self:
+            if record.chunk_size <= 0:
+                raise ValidationError(_('Chunk size must be positive'))
+
+    def action_start(self):
+        """Queue the import, resuming after the rows already committed."""
+        self.write({'state': 'queued'})
+        self.env.ref('hr_hospital.ir_cron_patient_import')._trigger()
+        return True
+
+    @api.model
+    def _cron_process_imports(self, max_chunks=50):
+        """Process queued imports, committing after every chunk.
+
+        Each run processes at most max_chunks chunks and re-triggers the
+        cron while work remains, so a large file never has to fit in one
+        transaction and an interrupted import resumes where it stopped.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        for job in self.search([('state', '=', 'queued')], order='id'):
+            max_chunks -= job._process(max_chunks, auto_commit=auto_commit)
+            if max_chunks <= 0:
+                break
+        if self.search_count([('state', '=', 'queued')]):
+            self.env.ref('hr_hospital.ir_cron_patient_import')._trigger()
+
+    def _open_stream(self):
+        """Open the uploaded file as a binary stream without loading it."""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'import_file'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
+
+    def _read_rows(self, stream):
+        """Yield the rows of the file as dicts, one at a time."""
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        if self.file_format == 'csv':
+            yield from csv.DictReader(text)
+            return
+        for line in text:
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = {'_error': str(e)}
+                yield row if isinstance(row, dict) else {
+                    '_error': _('Expected a JSON object')}
+
+    def _process(self, max_chunks, auto_commit=True):
+        """Import up to max_chunks chunks of the file.
+
+        A chunk that fails as a whole is retried row by row, so an invalid
+        row is logged and skipped instead of blocking the import.
+
+        Returns:
+            int: Number of processed chunks
+        """
+        self.ensure_one()
+        chunks = 0
+        try:
+            with self._open_stream() as stream:
+                rows = enumerate(self._read_rows(stream), start=1)
+                # Skip the rows committed by previous runs
+                rows = itertools.islice(rows, self.rows_processed, None)
+                while chunks < max_chunks:
+                    chunk = list(itertools.islice(rows, self.chunk_size))
+                    if not chunk:
+                        self.state = 'done'
+                        break
+                    try:
+                        with self.env.cr.savepoint():
+                            self._import_chunk(chunk)
+                    except Exception as e:
+                        _logger.info(
+                            'Patient import %s: chunk after row %s failed, '
+                            'retrying row by row: %s',
+                            self.id, self.rows_processed, e)
+                        self._import_rows(chunk)
+                    chunks += 1
+                    if auto_commit:
+                        self.env.cr.commit()
+                    # Keep memory flat whatever the file size
+                    self.env.invalidate_all()
+        except Exception as e:
+            _logger.warning(
+                'Patient import %s failed after row %s: %s',
+                self.id, self.rows_processed, e)
+            self.write({
+                'state': 'failed',
+                'error_log': '\n'.join(filter(None, [
+                    self.error_log,
+                    _('Row %(row)s: %(message)s') % {
+                        'row': self.rows_processed + 1, 'message': e},
+                ])),
+            })
+        if auto_commit:
+            self.env.cr.commit()
+        return chunks
+
+    @api.model
+    def _prepare_row(self, row):
+        """Validate a raw row and return the patient values it holds.
+
+        Raises:
+            ValueError: If the row cannot be imported
+        """
+        if row.get('_error'):
+            raise ValueError(row['_error'])
+        vals = {
+            field_name: str(row[field_name]).strip()
+            for field_name in IMPORT_FIELDS
+            if row.get(field_name) not in (None, '')
+        }
+        if not vals.get('name_first') or not vals.get('name_last'):
+            raise ValueError(_('First and last name are required'))
+        if 'gender' in vals:
+            vals['gender'] = vals['gender'].lower()
+            if vals['gender'] not in GENDERS:
+                raise ValueError(_('Unknown gender: %s') % vals['gender'])
+        if 'date_of_birth' in vals:
+            vals['date_of_birth'] = fields.Date.to_date(vals['date_of_birth'])
+        return vals
+
+    @api.model
+    def _get_identity_keys(self, vals):
+        """Return the passport and name + date of birth keys of a row."""
+        name_key = (
+            vals['name_first'].lower(), vals['name_last'].lower(),
+            vals['date_of_birth'],
+        ) if vals.get('date_of_birth') else None
+        return vals.get('passport_details'), name_key
+
+    def _match_patients(self, rows):
+        """Find the existing patients of the rows with a single query.
+
+        Returns:
+            tuple: (ids by passport, ids by (first, last, birth date))
+        """
+        passports = [passport for passport, _name_key in rows if passport]
+        name_keys = [name_key for _passport, name_key in rows if name_key]
+        if not passports and not name_keys:
+            return {}, {}
+        self.env['hr.hospital.patient'].flush_model([
+            'name_first', 'name_last', 'date_of_birth', 'passport_details'])
+        firsts, lasts, births = zip(*name_keys) if name_keys else ((), (), ())
+        self.env.cr.execute("""
+            SELECT id, passport_details,
+                   lower(name_first), lower(name_last), date_of_birth
+            FROM hr_hospital_patient
+            WHERE passport_details = ANY(%s)
+            OR (lower(name_first), lower(name_last), date_of_birth) IN (
+                SELECT * FROM unnest(%s::text[], %s::text[], %s::date[]))
+            ORDER BY id
+        """, (passports, list(firsts), list(lasts), list(births)))
+        by_passport, by_name = {}, {}
+        for patient_id, passport, *name_key in self.env.cr.fetchall():
+            if passport:
+                by_passport.setdefault(passport, patient_id)
+            by_name.setdefault(tuple(name_key), patient_id)
+        return by_passport, by_name
+
+    def _import_chunk(self, chunk):
+        """Validate, deduplicate and upsert one chunk of numbered rows."""
+        Patient = self.env['hr.hospital.patient'].with_context(
+            **BULK_IMPORT_CONTEXT)
+        errors = []
+        prepared = []
+        for row_number, row in chunk:
+            try:
+                vals = self._prepare_row(row)
+            except ValueError as e:
+                errors.append(_('Row %(row)s: %(message)s') % {
+                    'row': row_number, 'message': e})
+                continue
+            prepared.append(
+                (row_number, vals, self._get_identity_keys(vals)))
+
+        by_passport, by_name = self._match_patients(
+            [keys for _row_number, _vals, keys in prepared])
+
+        # Rows of the same patient are merged, later rows win
+        updates = {}
+        creates = {}
+        for row_number, vals, (passport, name_key) in prepared:
+            patient_id = by_passport.get(passport) or by_name.get(name_key)
+            if patient_id:
+                updates.setdefault(patient_id, {}).update(vals)
+            elif 'gender' not in vals:
+                errors.append(_('Row %(row)s: %(message)s') % {
+                    'row': row_number,
+                    'message': _('Gender is required for new patients'),
+                })
+            else:
+                key = passport or name_key or row_number
+                creates.setdefault(key, {}).update(vals)
+
+        for patient_id, vals in updates.items():
+            Patient.browse(patient_id).write(vals)
+        vals_list = list(creates.values())
+        Patient.create(vals_list)
+
+        self.write({
+            'rows_processed': chunk[-1][0],
+            'created_count': self.created_count + len(vals_list),
+            'updated_count': self.updated_count + len(updates),
+            'error_count': self.error_count + len(errors),
+            'error_log': self._append_errors(errors),
+        })
+
+    def _import_rows(self, chunk):
+        """Import the rows of a failed chunk one savepoint at a time.
+
+        Failing rows are recorded in the error log with their message and
+        the import moves past them.
+        """
+        for row_number, row in chunk:
+            try:
+                with self.env.cr.savepoint():
+                    self._import_chunk([(row_number, row)])
+            except Exception as e:
+                self.write({
+                    'rows_processed': row_number,
+                    'error_count': self.error_count + 1,
+                    'error_log': self._append_errors([
+                        _('Row %(row)s: %(message)s') % {
+                            'row': row_number, 'message': e},
+                    ]),
+                })
+
+    def _append_errors(self, errors):
+        """Append errors to the log until MAX_LOGGED_ERRORS are kept."""
+        logged = self.error_log.count('\n') + 1 if self.error_log else 0
+        errors = errors[:max(MAX_LOGGED_ERRORS - logged, 0)]
+        return '\n'.join(filter(None, [self.error_log] + errors)) or False
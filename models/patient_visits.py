@@ -1,19 +1,50 @@
 import logging
-from odoo import models, fields, api, _
+import random
+import time
+from datetime import timedelta
+
+from psycopg2 import IntegrityError
+from psycopg2.errors import LockNotAvailable, UniqueViolation
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index, index_exists
+
+from .time_validation_mixin import time_to_minute
 
 _logger = logging.getLogger(__name__)
 
+# Bounded exponential backoff between slot claim attempts, in seconds
+BOOKING_BACKOFF_BASE = 0.05
+BOOKING_BACKOFF_MAX = 0.5
+
+# Visits in these states no longer hold their slot nor their patient's day
+INACTIVE_STATES = ('cancelled', 'no_show')
+
+# Partial unique indexes enforcing bookings of active visits
+ACTIVE_SLOT_INDEX = 'hr_hospital_patient_visits_active_minute_uniq'
+PATIENT_DAY_INDEX = 'hr_hospital_patient_visits_patient_day_uniq'
+
+# States each visit transition may start from, as offered by the form
+TRANSITION_STATES = {
+    'scheduled': ('draft',),
+    'in_progress': ('scheduled',),
+    'completed': ('in_progress',),
+    'cancelled': (
+        'draft', 'scheduled', 'in_progress', 'no_show', 'cancelled'),
+}
+
+# What the no-show sweep does with scheduled visits whose time has passed
+NO_SHOW_ACTIONS = {
+    'no_show': 'no_show',
+    'cancel': 'cancelled',
+}
+
 
 class PatientVisits(models.Model):
     _name = "hr.hospital.patient.visits"
     _description = "Patient Visits"
     _inherit = ['hr.hospital.time.validation.mixin']
-    _sql_constraints = [
-        ('unique_physician_datetime',
-         'UNIQUE(physician_id, appointment_date, appointment_time)',
-         _('This time slot is already booked for this physician!'))
-    ]
 
     appointment_date = fields.Date(
         string='Appointment Date',
@@ -24,11 +55,20 @@ class PatientVisits(models.Model):
         required=True,
         help='24-hour format (e.g., 13.5 for 1:30 PM)'
     )
+    appointment_minute = fields.Integer(
+        string='Minute of Day',
+        compute='_compute_appointment_minute',
+        store=True,
+        precompute=True,
+        help='Appointment time in minutes since midnight, used for slot '
+        'lookups and range scans'
+    )
     state = fields.Selection([
         ('draft', _('Draft')),
         ('scheduled', _('Scheduled')),
         ('in_progress', _('In Progress')),
         ('completed', _('Completed')),
+        ('no_show', _('No Show')),
         ('cancelled', _('Cancelled'))
     ], default='draft', required=True, string='Status')
     physician_id = fields.Many2one(
@@ -53,67 +93,210 @@ class PatientVisits(models.Model):
         store=True
     )
 
-    @api.depends('physician_id', 'appointment_date', 'appointment_time')
+    @api.depends('appointment_time')
+    def _compute_appointment_minute(self):
+        for visit in self:
+            visit.appointment_minute = time_to_minute(visit.appointment_time)
+
+    @api.depends('physician_id', 'appointment_date', 'appointment_minute')
     def _compute_schedule_slot(self):
+        """Resolve the slots of all visits in the recordset with one query."""
+        keys = {
+            (visit.physician_id.id, visit.appointment_date,
+             visit.appointment_minute)
+            for visit in self
+            if visit.physician_id and visit.appointment_date
+            and visit.appointment_minute
+        }
+        slot_ids = {}
+        if keys:
+            self.env['hr.hospital.physician.schedule'].flush_model([
+                'physician_id', 'appointment_date', 'appointment_minute'])
+            physician_ids, dates, minutes = zip(*keys)
+            self.env.cr.execute("""
+                SELECT physician_id, appointment_date, appointment_minute, id
+                FROM hr_hospital_physician_schedule
+                WHERE (physician_id, appointment_date, appointment_minute) IN (
+                    SELECT * FROM unnest(%s::int[], %s::date[], %s::int[]))
+            """, (list(physician_ids), list(dates), list(minutes)))
+            slot_ids = {
+                tuple(key): slot_id
+                for *key, slot_id in self.env.cr.fetchall()
+            }
         for visit in self:
-            if visit.physician_id and visit.appointment_date and visit.appointment_time:
-                schedule = self.env['hr.hospital.physician.schedule'].search([
-                    ('physician_id', '=', visit.physician_id.id),
-                    ('appointment_date', '=', visit.appointment_date),
-                    ('appointment_time', '=', visit.appointment_time)
-                ], limit=1)
-                visit.schedule_id = schedule.id if schedule else False
+            visit.schedule_id = slot_ids.get(
+                (visit.physician_id.id, visit.appointment_date,
+                 visit.appointment_minute), False)
 
-    @api.model_create_multi
-    def create(self, vals_list):
-        for vals in vals_list:
-            # Skip validations if context flag is set
-            if self._context.get('skip_schedule_validation'):
+    @api.model
+    def _link_schedule_slots(self, slot_ids=None):
+        """Point visits at the slots matching their physician, date and time.
+
+        The schedule_id compute only runs when a visit changes, so visits
+        booked before their slot was generated stay unlinked. This
+        back-fill relinks them with set-based UPDATEs, for all slots or
+        only the given ones, and unlinks visits from slots that were moved.
+
+        Args:
+            slot_ids (list): Restrict to these schedule slots
+
+        Returns:
+            int: Number of visits whose slot changed
+        """
+        Schedule = self.env['hr.hospital.physician.schedule']
+        Schedule.flush_model([
+            'physician_id', 'appointment_date', 'appointment_minute'])
+        self.flush_model([
+            'physician_id', 'appointment_date', 'appointment_minute',
+            'schedule_id'])
+        slot_condition = 'AND s.id = ANY(%(slot_ids)s)' \
+            if slot_ids is not None else ''
+        params = {'slot_ids': list(slot_ids or [])}
+
+        self.env.cr.execute("""
+            UPDATE hr_hospital_patient_visits v
+            SET schedule_id = NULL
+            FROM hr_hospital_physician_schedule s
+            WHERE v.schedule_id = s.id
+            AND (v.physician_id, v.appointment_date, v.appointment_minute)
+                IS DISTINCT FROM
+                (s.physician_id, s.appointment_date, s.appointment_minute)
+            {slot_condition}
+        """.format(slot_condition=slot_condition), params)
+        count = self.env.cr.rowcount
+        self.env.cr.execute("""
+            UPDATE hr_hospital_patient_visits v
+            SET schedule_id = s.id
+            FROM hr_hospital_physician_schedule s
+            WHERE s.physician_id = v.physician_id
+            AND s.appointment_date = v.appointment_date
+            AND s.appointment_minute = v.appointment_minute
+            AND v.schedule_id IS DISTINCT FROM s.id
+            {slot_condition}
+        """.format(slot_condition=slot_condition), params)
+        count += self.env.cr.rowcount
+
+        if count:
+            self.invalidate_model(['schedule_id'])
+            Schedule.invalidate_model(['visit_ids'])
+            _logger.info('Linked %s visits to their schedule slots', count)
+        return count
+
+    def init(self):
+        for index_name, columns in [
+            (ACTIVE_SLOT_INDEX,
+             'physician_id, appointment_date, appointment_minute'),
+            (PATIENT_DAY_INDEX, 'patient_id, appointment_date'),
+        ]:
+            if index_exists(self.env.cr, index_name):
                 continue
+            try:
+                with self.env.cr.savepoint(flush=False):
+                    self.env.cr.execute("""
+                        CREATE UNIQUE INDEX {index_name}
+                        ON hr_hospital_patient_visits ({columns})
+                        WHERE state NOT IN ('cancelled', 'no_show')
+                    """.format(index_name=index_name, columns=columns))
+            except IntegrityError:
+                _logger.warning(
+                    'Could not create %s, existing visits conflict. '
+                    'Booking conflicts are checked in Python until they '
+                    'are resolved.', index_name)
+        # Serves the next appointment lookup of patients
+        create_index(
+            self.env.cr,
+            'hr_hospital_patient_visits_patient_next_index',
+            self._table,
+            ['patient_id', 'appointment_date', 'appointment_minute'],
+            where="state = 'scheduled'")
+        # Keeps the no-show sweep off the bulk of past visits
+        create_index(
+            self.env.cr,
+            'hr_hospital_patient_visits_scheduled_index',
+            self._table,
+            ['appointment_date', 'appointment_minute'],
+            where="state = 'scheduled'")
+        # Serves the pages of the patient timeline
+        create_index(
+            self.env.cr,
+            'hr_hospital_patient_visits_timeline_index',
+            self._table,
+            ['patient_id', 'appointment_date', 'appointment_minute', 'id'])
 
-            required_keys = ['physician_id', 'appointment_date', 'appointment_time']
-            if all(k in vals for k in required_keys):
-                # Lock the schedule slot first to prevent race conditions
-                self.env.cr.execute("""
-                    SELECT id FROM hr_hospital_physician_schedule
-                    WHERE physician_id = %s
-                    AND appointment_date = %s
-                    AND appointment_time = %s
-                    FOR UPDATE NOWAIT
-                """, (
-                    vals['physician_id'],
-                    vals['appointment_date'],
-                    vals['appointment_time']
-                ))
+    @api.model
+    @tools.ormcache()
+    def _has_booking_indexes(self):
+        """Whether the database enforces unique active bookings."""
+        return index_exists(self.env.cr, ACTIVE_SLOT_INDEX) and \
+            index_exists(self.env.cr, PATIENT_DAY_INDEX)
 
-                existing = self.search([
-                    ('physician_id', '=', vals['physician_id']),
-                    ('appointment_date', '=', vals['appointment_date']),
-                    ('appointment_time', '=', vals['appointment_time']),
-                    ('state', 'not in', ['cancelled'])
-                ])
-                if existing:
-                    raise ValidationError(_(
-                        'This time slot is already booked for another patient'
-                    ))
+    @api.model
+    def _raise_booking_violation(self, error, rows=None):
+        """Turn a partial unique index violation into a ValidationError.
 
-            # Check if the patient is trying to create a duplicate appointment
-            # on the same day
-            if 'patient_id' in vals and 'appointment_date' in vals:
-                existing_appointment = self.search([
-                    ('patient_id', '=', vals['patient_id']),
-                    ('appointment_date', '=', vals['appointment_date']),
-                    # Ignore cancelled appointments
-                    ('state', 'not in', ['cancelled'])
-                ], limit=1)
-
-                if existing_appointment:
-                    raise ValidationError(_(
-                        'This patient already has an '
-                        'appointment on the specified date.'
-                    ))
+        When the rows of a rolled back create are given, the Python batch
+        check runs as a fallback to report every offending row; otherwise
+        the violated index decides the message.
+        """
+        if rows:
+            self._check_booking_batch(
+                rows, check_patient_day=True, query_conflicts=True)
+        if error.diag.constraint_name == PATIENT_DAY_INDEX:
+            raise ValidationError(_(
+                'This patient already has an '
+                'appointment on the specified date.'
+            )) from error
+        raise ValidationError(_(
+            'This time slot is already booked for another patient'
+        )) from error
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Skip validations if context flag is set
+        if self._context.get('skip_schedule_validation'):
+            records = super(PatientVisits, self).create(vals_list)
+            self._refresh_slot_availability(records._get_slot_keys())
+            return records
+
+        # Validate and lock the whole batch at once; conflicts with
+        # existing visits are enforced by the partial unique indexes
+        rows = [self._prepare_booking_row(vals) for vals in vals_list]
+        try:
+            self._check_booking_batch(
+                rows, check_patient_day=True, lock_slots=True)
+        except ValidationError:
+            # Include conflicts with existing visits in the error report
+            self._check_booking_batch(
+                rows, check_patient_day=True, query_conflicts=True)
+            raise
+        try:
+            with self.env.cr.savepoint():
+                records = super(PatientVisits, self).create(vals_list)
+        except UniqueViolation as e:
+            if self._context.get('booking_slot_claim') and \
+                    e.diag.constraint_name == ACTIVE_SLOT_INDEX:
+                # A lost slot race, book_slot moves on to another slot
+                raise
+            self._raise_booking_violation(e, rows)
+        self._refresh_slot_availability(records._get_slot_keys())
+        return records
+
+    def _get_slot_keys(self):
+        """Return the (physician_id, date, minute) keys of these visits."""
+        return {
+            (record.physician_id.id, record.appointment_date,
+             record.appointment_minute)
+            for record in self
+        }
 
-        return super(PatientVisits, self).create(vals_list)
+    @api.model
+    def _refresh_slot_availability(self, slot_keys):
+        """Refresh the stored slot availability and the physician day
+        booking bits touched by bookings on the given slot keys."""
+        self.env['hr.hospital.physician.schedule']._refresh_availability(
+            slot_keys)
+        self.env['hr.hospital.physician.day']._update_bits(
+            'booked_mask', slot_keys)
 
     @api.constrains('appointment_time', 'appointment_date')
     def _check_appointment_time(self):
@@ -142,82 +325,513 @@ class PatientVisits(models.Model):
         This check runs for ALL states (including draft) to ensure data integrity.
         
         The validation ensures:
-        1. A schedule slot exists for the physician at the given time
-        2. No other non-cancelled visits exist for this slot
+        1. A schedule slot (or a template rule for template-based
+           physicians) exists for the physician at the given time
+        2. No other active visits exist for this slot
         """
-        for record in self:
-            # Always check for schedule availability, regardless of state
-            schedule = self.env['hr.hospital.physician.schedule'].search([
-                ('physician_id', '=', record.physician_id.id),
-                ('appointment_date', '=', record.appointment_date),
-                ('appointment_time', '=', record.appointment_time)
-            ])
-            if not schedule:
-                raise ValidationError(_(
-                    'Selected time slot is not available in physician\'s '
-                    'schedule. Please check the physician\'s schedule first.'
-                ))
+        self._check_booking_batch(self._get_booking_rows())
 
-            # Check for conflicting visits (excluding cancelled ones and self)
-            other_visit = self.search([
-                ('id', '!=', record.id),
-                ('physician_id', '=', record.physician_id.id),
-                ('appointment_date', '=', record.appointment_date),
-                ('appointment_time', '=', record.appointment_time),
-                ('state', 'not in', ['cancelled'])
-            ])
-            if other_visit:
-                raise ValidationError(_(
-                    'This time slot is already booked for another patient'
-                ))
+    def _get_booking_rows(self):
+        """Return the booking rows of these visits for batch checks."""
+        return [{
+            'id': record.id,
+            'physician_id': record.physician_id.id,
+            'patient_id': record.patient_id.id,
+            'appointment_date': record.appointment_date,
+            'appointment_time': record.appointment_time,
+            'appointment_minute': record.appointment_minute,
+            'state': record.state,
+        } for record in self]
 
-    def action_schedule(self):
-        self.ensure_one()
-        # Use a savepoint to ensure atomic operation
-        with self.env.cr.savepoint():
-            # Lock the schedule slot
+    @api.model
+    def _prepare_booking_row(self, vals):
+        """Normalize create values into a booking row for batch checks."""
+        appointment_time = vals.get('appointment_time')
+        return {
+            'id': False,
+            'physician_id': vals.get('physician_id'),
+            'patient_id': vals.get('patient_id'),
+            'appointment_date': fields.Date.to_date(
+                vals.get('appointment_date')),
+            'appointment_time': appointment_time,
+            'appointment_minute': time_to_minute(appointment_time)
+            if appointment_time is not None else False,
+            'state': vals.get('state', 'draft'),
+        }
+
+    @api.model
+    def _get_scheduled_slot_keys(self, rows, lock_slots=False):
+        """Return the (physician_id, date, minute) keys of the rows that
+        match the physicians' schedules.
+
+        Generated slots are fetched (and optionally locked, in id order to
+        avoid deadlocks) with one query; template-based physicians are
+        matched against their rules and exceptions, read in one query each.
+        """
+        physicians = self.env['hr.hospital.physician'].browse(
+            {row['physician_id'] for row in rows})
+        templated = physicians.filtered('schedule_template_id')
+        keys = {
+            (row['physician_id'], row['appointment_date'],
+             row['appointment_minute'])
+            for row in rows
+        }
+
+        slot_keys = set()
+        generated = [key for key in keys if key[0] not in templated.ids]
+        if generated:
+            self.env['hr.hospital.physician.schedule'].flush_model([
+                'physician_id', 'appointment_date', 'appointment_minute'])
+            physician_ids, dates, minutes = zip(*generated)
             self.env.cr.execute("""
-                SELECT id FROM hr_hospital_physician_schedule
+                SELECT physician_id, appointment_date, appointment_minute
+                FROM hr_hospital_physician_schedule
+                WHERE (physician_id, appointment_date, appointment_minute) IN (
+                    SELECT * FROM unnest(%s::int[], %s::date[], %s::int[]))
+                ORDER BY id
+            """ + ("FOR UPDATE NOWAIT" if lock_slots else ""),
+                (list(physician_ids), list(dates), list(minutes)))
+            slot_keys.update(self.env.cr.fetchall())
+
+        slot_keys |= templated._match_virtual_slots(
+            {key for key in keys if key[0] in templated.ids})
+        return slot_keys
+
+    @api.model
+    def _check_booking_batch(self, rows, check_patient_day=False,
+                             lock_slots=False, query_conflicts=None):
+        """Validate a batch of bookings in a constant number of queries.
+
+        One query checks slot existence, one looks up physician-time
+        conflicts and, for new bookings, one looks up patient-day
+        duplicates. Collisions inside the batch are detected in memory.
+        When the partial unique indexes exist, the conflict lookups are
+        left to the database.
+
+        Args:
+            rows (list): Dicts with id, physician_id, patient_id,
+                appointment_date, appointment_time, appointment_minute
+                and state
+            check_patient_day (bool): Also reject a second appointment of
+                a patient on the same day
+            lock_slots (bool): Lock the matched schedule slots
+            query_conflicts (bool): Look up conflicts with existing visits,
+                by default only when the database does not enforce them
+
+        Raises:
+            ValidationError: Listing every offending row
+        """
+        slot_rows = [
+            (index, row) for index, row in enumerate(rows)
+            if row['physician_id'] and row['appointment_date']
+            and row['appointment_minute']
+        ]
+        # Cancelled and no-show visits neither block nor are blocked by
+        # other visits
+        active_slot_rows = [
+            (index, row) for index, row in slot_rows
+            if row['state'] not in INACTIVE_STATES
+        ]
+        patient_rows = [
+            (index, row) for index, row in enumerate(rows)
+            if check_patient_day and row['patient_id']
+            and row['appointment_date']
+            and row['state'] not in INACTIVE_STATES
+        ]
+        batch_ids = {row['id'] for row in rows if row['id']}
+        errors = {}
+        if query_conflicts is None:
+            query_conflicts = not self._has_booking_indexes()
+        if query_conflicts:
+            self.flush_model([
+                'physician_id', 'patient_id', 'appointment_date',
+                'appointment_minute', 'state'])
+
+        def add_error(index, message):
+            errors.setdefault(index, message)
+
+        # Physician-time conflicts, in the database and inside the batch
+        booked = set()
+        if active_slot_rows and query_conflicts:
+            physician_ids, dates, minutes = zip(*(
+                (row['physician_id'], row['appointment_date'],
+                 row['appointment_minute'])
+                for _index, row in active_slot_rows))
+            self.env.cr.execute("""
+                SELECT id, physician_id, appointment_date, appointment_minute
+                FROM hr_hospital_patient_visits
+                WHERE (physician_id, appointment_date, appointment_minute) IN (
+                    SELECT * FROM unnest(%s::int[], %s::date[], %s::int[]))
+                AND state NOT IN ('cancelled', 'no_show')
+            """, (list(physician_ids), list(dates), list(minutes)))
+            booked = {
+                tuple(key) for visit_id, *key in self.env.cr.fetchall()
+                if visit_id not in batch_ids
+            }
+        if active_slot_rows:
+            seen = set()
+            for index, row in active_slot_rows:
+                key = (row['physician_id'], row['appointment_date'],
+                       row['appointment_minute'])
+                if key in booked or key in seen:
+                    add_error(index, _(
+                        'This time slot is already booked for another patient'
+                    ))
+                seen.add(key)
+
+        # Same-day appointments of a patient
+        booked = set()
+        if patient_rows and query_conflicts:
+            patient_ids, dates = zip(*(
+                (row['patient_id'], row['appointment_date'])
+                for _index, row in patient_rows))
+            self.env.cr.execute("""
+                SELECT id, patient_id, appointment_date
+                FROM hr_hospital_patient_visits
+                WHERE (patient_id, appointment_date) IN (
+                    SELECT * FROM unnest(%s::int[], %s::date[]))
+                AND state NOT IN ('cancelled', 'no_show')
+            """, (list(patient_ids), list(dates)))
+            booked = {
+                tuple(key) for visit_id, *key in self.env.cr.fetchall()
+                if visit_id not in batch_ids
+            }
+        if patient_rows:
+            seen = set()
+            for index, row in patient_rows:
+                key = (row['patient_id'], row['appointment_date'])
+                if key in booked or key in seen:
+                    add_error(index, _(
+                        'This patient already has an '
+                        'appointment on the specified date.'
+                    ))
+                seen.add(key)
+
+        # Slot existence, regardless of state
+        if slot_rows:
+            slot_keys = self._get_scheduled_slot_keys(
+                [row for _index, row in slot_rows], lock_slots=lock_slots)
+            for index, row in slot_rows:
+                key = (row['physician_id'], row['appointment_date'],
+                       row['appointment_minute'])
+                if key not in slot_keys:
+                    add_error(index, _(
+                        'Selected time slot is not available in physician\'s '
+                        'schedule. Please check the physician\'s schedule '
+                        'first.'
+                    ))
+
+        if not errors:
+            return
+        if len(rows) == 1:
+            raise ValidationError(errors[0])
+        raise ValidationError('\n'.join(
+            _('Line %(line)s: %(message)s') % {
+                'line': index + 1,
+                'message': errors[index],
+            } for index in sorted(errors)))
+
+    @api.model
+    def _claim_slot(self, physician_id, appointment_date, appointment_time,
+                    fallback=False, excluded_ids=()):
+        """Lock a free schedule slot without waiting for other bookings.
+
+        Slots locked by a concurrent booking are skipped. With fallback,
+        the next free slot of the physician from the requested moment on
+        is claimed instead.
+
+        Returns:
+            tuple: (id, appointment_date, appointment_time) or None
+        """
+        self.env['hr.hospital.physician.schedule'].flush_model()
+        appointment_minute = time_to_minute(appointment_time)
+        if fallback:
+            self.env.cr.execute("""
+                SELECT id, appointment_date, appointment_time
+                FROM hr_hospital_physician_schedule
+                WHERE physician_id = %s
+                AND (appointment_date, appointment_minute) >= (%s, %s)
+                AND is_available
+                AND id != ALL(%s)
+                ORDER BY appointment_date, appointment_minute
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """, (physician_id, appointment_date, appointment_minute,
+                  list(excluded_ids)))
+        else:
+            self.env.cr.execute("""
+                SELECT id, appointment_date, appointment_time
+                FROM hr_hospital_physician_schedule
                 WHERE physician_id = %s
                 AND appointment_date = %s
-                AND appointment_time = %s
+                AND appointment_minute = %s
+                AND is_available
+                AND id != ALL(%s)
+                FOR UPDATE SKIP LOCKED
+            """, (physician_id, appointment_date, appointment_minute,
+                  list(excluded_ids)))
+        return self.env.cr.fetchone()
+
+    @api.model
+    def _has_free_slot(self, physician_id, appointment_date, appointment_time,
+                       fallback=False, excluded_ids=()):
+        """Check without locking whether a claimable slot still exists."""
+        self.env.cr.execute("""
+            SELECT 1 FROM hr_hospital_physician_schedule
+            WHERE physician_id = %s
+            AND {slot_condition}
+            AND is_available
+            AND id != ALL(%s)
+            LIMIT 1
+        """.format(slot_condition=(
+            '(appointment_date, appointment_minute) >= (%s, %s)' if fallback
+            else 'appointment_date = %s AND appointment_minute = %s')),
+            (physician_id, appointment_date, time_to_minute(appointment_time),
+             list(excluded_ids)))
+        return bool(self.env.cr.fetchone())
+
+    @api.model
+    def book_slot(self, physician_id, patient_id, appointment_date,
+                  appointment_time, fallback=False, max_attempts=3,
+                  notes=False):
+        """Book a visit by claiming its schedule slot atomically.
+
+        The slot is claimed with FOR UPDATE SKIP LOCKED, so concurrent
+        receptionists never wait on each other's locks. A slot locked by
+        another booking is retried with bounded exponential backoff; with
+        fallback, the next free slot of the same physician is booked
+        instead. Errors are reported in the result rather than raised.
+
+        Only generated schedule slots can be claimed: physicians working
+        from a schedule template have no stored slots to lock, so their
+        bookings are rejected with status 'invalid' until their schedule
+        is generated.
+
+        Args:
+            physician_id (int): ID of the physician
+            patient_id (int): ID of the patient
+            appointment_date (date): Requested appointment date
+            appointment_time (float): Requested time in 24-hour format
+            fallback (bool): Book the next free slot if the requested
+                one is taken
+            max_attempts (int): Maximum number of claim attempts
+            notes (str): Visit notes
+
+        Returns:
+            dict: status ('booked', 'unavailable', 'busy' or 'invalid'),
+            visit_id, schedule_id, appointment_date, appointment_time,
+            fallback_used, attempts and message
+        """
+        appointment_date = fields.Date.to_date(appointment_date)
+        result = {
+            'status': 'busy',
+            'visit_id': False,
+            'schedule_id': False,
+            'appointment_date': fields.Date.to_string(appointment_date),
+            'appointment_time': appointment_time,
+            'fallback_used': False,
+            'attempts': 0,
+            'message': _('This time slot is being booked by someone else'),
+        }
+        excluded_ids = set()
+
+        physician = self.env['hr.hospital.physician'].browse(physician_id)
+        if physician.schedule_template_id:
+            result.update(status='invalid', message=_(
+                'Physician %s works from a schedule template, generate '
+                'the schedule slots before booking online'
+            ) % physician.display_name)
+            return result
+
+        # Lost slot races surface as UniqueViolation instead of a
+        # ValidationError, so the slot is skipped
+        Visits = self.with_context(booking_slot_claim=True)
+        for attempt in range(max_attempts):
+            result['attempts'] = attempt + 1
+            slot = None
+            try:
+                with self.env.cr.savepoint():
+                    slot = self._claim_slot(
+                        physician_id, appointment_date, appointment_time,
+                        fallback=fallback, excluded_ids=excluded_ids)
+                    if slot:
+                        schedule_id, slot_date, slot_time = slot
+                        visit = Visits.create({
+                            'physician_id': physician_id,
+                            'patient_id': patient_id,
+                            'appointment_date': slot_date,
+                            'appointment_time': slot_time,
+                            'state': 'scheduled',
+                            'notes': notes,
+                        })
+                        result.update(
+                            status='booked',
+                            visit_id=visit.id,
+                            schedule_id=schedule_id,
+                            appointment_date=fields.Date.to_string(slot_date),
+                            appointment_time=slot_time,
+                            fallback_used=(slot_date, slot_time) != (
+                                appointment_date, appointment_time),
+                            message=_('Appointment booked'),
+                        )
+                        return result
+            except ValidationError as e:
+                result.update(status='invalid', message=str(e))
+                return result
+            except (UniqueViolation, LockNotAvailable) as e:
+                # Lost a race on this slot, never claim it again. Other
+                # errors, serialization failures in particular, propagate
+                # so the whole request is retried by the server.
+                _logger.info('Slot claim conflict, retrying: %s', e)
+                if slot:
+                    excluded_ids.add(slot[0])
+
+            if not self._has_free_slot(
+                    physician_id, appointment_date, appointment_time,
+                    fallback=fallback, excluded_ids=excluded_ids):
+                result.update(status='unavailable', message=_(
+                    'No free slot found for this physician') if fallback
+                    else _('This time slot is not available'))
+                return result
+
+            # The free slot is locked by a concurrent booking
+            if attempt + 1 < max_attempts:
+                delay = min(
+                    BOOKING_BACKOFF_BASE * 2 ** attempt, BOOKING_BACKOFF_MAX)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+        return result
+
+    def _check_transition(self, target_state):
+        """Validate that all visits may move to the target state.
+
+        The preconditions are read for the whole recordset at once, so
+        checking a full clinic day costs a single query.
+
+        Raises:
+            ValidationError: Listing the visits that cannot transition
+        """
+        allowed_states = TRANSITION_STATES[target_state]
+        invalid = self.filtered(lambda v: v.state not in allowed_states)
+        if target_state == 'cancelled':
+            message = _('Cannot cancel a completed visit')
+        else:
+            state_labels = dict(
+                self._fields['state']._description_selection(self.env))
+            message = _('Only %(states)s visits can be moved to %(state)s') % {
+                'states': ', '.join(
+                    state_labels[state] for state in allowed_states),
+                'state': state_labels[target_state],
+            }
+        if not invalid and target_state == 'completed':
+            invalid = self.filtered(lambda v: not v.diagnosis_id)
+            message = _('Please add a diagnosis before completing the visit')
+        if not invalid:
+            return
+        if len(self) == 1:
+            raise ValidationError(message)
+        raise ValidationError('\n'.join([message] + [
+            _('%(patient)s with %(physician)s on %(date)s at %(time)s') % {
+                'patient': visit.patient_id.display_name,
+                'physician': visit.physician_id.display_name,
+                'date': visit.appointment_date,
+                'time': '%02d:%02d' % divmod(visit.appointment_minute, 60),
+            } for visit in invalid]))
+
+    def _lock_schedule_slots(self):
+        """Lock the schedule slots of these visits in one statement.
+
+        Slots are locked in id order, so concurrent actions on overlapping
+        visits cannot deadlock.
+        """
+        slot_ids = sorted(set(self.schedule_id.ids))
+        if slot_ids:
+            self.env.cr.execute("""
+                SELECT id FROM hr_hospital_physician_schedule
+                WHERE id = ANY(%s)
+                ORDER BY id
                 FOR UPDATE NOWAIT
-            """, (self.physician_id.id, self.appointment_date, self.appointment_time))
+            """, (slot_ids,))
 
-            if not self.schedule_id:
-                raise ValidationError(_(
-                    'No available slot found in physician\'s schedule'
-                ))
-            self._check_physician_availability()
-            self.state = 'scheduled'
+    def action_schedule(self):
+        # Use a savepoint to ensure atomic operation
+        with self.env.cr.savepoint():
+            self._check_transition('scheduled')
+            # Check slots and conflicts of all visits, locking the slots
+            self._check_booking_batch(
+                self._get_booking_rows(), lock_slots=True)
+            self.write({'state': 'scheduled'})
         return True
 
     def action_start(self):
-        self.ensure_one()
-        self.state = 'in_progress'
+        self._check_transition('in_progress')
+        self.write({'state': 'in_progress'})
+        return True
 
     def action_complete(self):
-        self.ensure_one()
-        if not self.diagnosis_id:
-            raise ValidationError(_(
-                'Please add a diagnosis before completing the visit'
-            ))
-        self.state = 'completed'
+        self._check_transition('completed')
+        self.write({'state': 'completed'})
+        return True
 
     def action_cancel(self):
-        self.ensure_one()
         # Use a savepoint to ensure atomic operation
         with self.env.cr.savepoint():
-            if self.state == 'completed':
-                raise ValidationError(_('Cannot cancel a completed visit'))
-            # Lock the schedule slot
-            if self.schedule_id:
-                self.env.cr.execute("""
-                    SELECT id FROM hr_hospital_physician_schedule
-                    WHERE id = %s
-                    FOR UPDATE NOWAIT
-                """, (self.schedule_id.id,))
-            self.state = 'cancelled'
+            self._check_transition('cancelled')
+            self._lock_schedule_slots()
+            self.write({'state': 'cancelled'})
+        return True
+
+    @api.model
+    def _cron_sweep_no_shows(self, now=None):
+        """Close scheduled visits whose time has passed.
+
+        Depending on the hr_hospital.no_show_action parameter, visits more
+        than hr_hospital.no_show_grace_minutes past their start are marked
+        as no-show or cancelled with a single UPDATE. Only the patients of
+        the swept visits get their next appointment recomputed.
+
+        Appointment dates and times are local wall-clock values, so the
+        cutoff is taken in the timezone of the user running the sweep.
+
+        Args:
+            now (datetime): UTC moment to sweep up to, defaults to now
+
+        Returns:
+            int: Number of swept visits
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        action = params.get_param('hr_hospital.no_show_action', 'no_show')
+        if action not in NO_SHOW_ACTIONS:
+            _logger.warning('Unknown no-show action %r, using no_show', action)
+            action = 'no_show'
+        grace = int(params.get_param('hr_hospital.no_show_grace_minutes', 60))
+        local_now = fields.Datetime.context_timestamp(
+            self, now or fields.Datetime.now()).replace(tzinfo=None)
+        cutoff = local_now - timedelta(minutes=grace)
+
+        self.flush_model(['appointment_date', 'appointment_minute', 'state'])
+        self.env.cr.execute("""
+            UPDATE hr_hospital_patient_visits
+            SET state = %s, write_uid = %s, write_date = NOW() AT TIME ZONE 'UTC'
+            WHERE state = 'scheduled'
+            AND (appointment_date, appointment_minute) < (%s, %s)
+            RETURNING id
+        """, (NO_SHOW_ACTIONS[action], self.env.uid, cutoff.date(),
+              cutoff.hour * 60 + cutoff.minute))
+        visits = self.browse(row[0] for row in self.env.cr.fetchall())
+        if not visits:
+            return 0
+
+        self.invalidate_model(['state', 'write_uid', 'write_date'])
+        # Recompute the next appointment of the affected patients only
+        visits.modified(['state'])
+        # Both actions free the slot for another booking
+        self._refresh_slot_availability(visits._get_slot_keys())
+        self.env['hr.hospital.patient'].flush_model([
+            'next_appointment_date', 'next_appointment_time'])
+        _logger.info(
+            'No-show sweep: %s visits set to %s for %s patients',
+            len(visits), NO_SHOW_ACTIONS[action], len(visits.patient_id))
+        return len(visits)
 
     def write(self, vals):
         # Get the current date and time
@@ -240,8 +854,25 @@ class PatientVisits(models.Model):
                         'place and cannot be modified.'
                         ))
 
+        # Keep slot availability and day bitmaps in sync with bookings
+        booking_fields = {
+            'physician_id', 'appointment_date', 'appointment_time',
+            'appointment_minute', 'state'}
+        old_keys = self._get_slot_keys() \
+            if booking_fields & set(vals) else set()
+
         # Call the super method to proceed with the write operation
-        return super(PatientVisits, self).write(vals)
+        res = super(PatientVisits, self).write(vals)
+        if old_keys:
+            # Surface partial unique index violations as validation errors
+            try:
+                with self.env.cr.savepoint(flush=False):
+                    self.flush_recordset(
+                        list(booking_fields | {'patient_id'}))
+            except UniqueViolation as e:
+                self._raise_booking_violation(e)
+            self._refresh_slot_availability(old_keys | self._get_slot_keys())
+        return res
 
     def unlink(self):
         """Prevent deletion of completed visits or visits with diagnosis."""
@@ -250,4 +881,7 @@ class PatientVisits(models.Model):
                 raise ValidationError(_(
                     "Cannot delete a completed visit or a visit that has a "
                     "diagnosis. Cancel the visit instead if necessary."))
-        return super().unlink()
+        slot_keys = self._get_slot_keys()
+        res = super().unlink()
+        self._refresh_slot_availability(slot_keys)
+        return res
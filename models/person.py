@@ -1,10 +1,38 @@
+import base64
+import hashlib
 import logging
+from time import perf_counter
 from datetime import datetime, time
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+
+from .time_validation_mixin import time_to_minute
 
 _logger = logging.getLogger(__name__)
 
+# Context of bulk imports: no tracking values, no creation log message, no
+# followers and no schedule generation during the import transaction
+BULK_IMPORT_CONTEXT = {
+    'tracking_disable': True,
+    'mail_create_nolog': True,
+    'mail_create_nosubscribe': True,
+    'mail_notrack': True,
+    'defer_schedule_generation': True,
+}
+BULK_IMPORT_CHUNK_SIZE = 1000
+# Searched terms with at least this many digits and no letters are also
+# matched against the normalized phone numbers
+PHONE_SEARCH_MIN_DIGITS = 4
+
+
+def normalize_phone(phone):
+    """Reduce a phone number to its digits, so formatting does not
+    matter when numbers are compared."""
+    return ''.join(char for char in phone or '' if char.isdigit())
+
 
 class Person(models.AbstractModel):
     _name = 'hr.hospital.person'
@@ -16,19 +44,19 @@ class Person(models.AbstractModel):
         string='First Name',
         required=True,
         tracking=True,
-        index=True
+        index='trigram'
     )
     name_last = fields.Char(
         string='Last Name',
         required=True,
         tracking=True,
-        index=True
+        index='trigram'
     )
     display_name = fields.Char(
         string='Full Name',
         compute='_compute_display_name',
         store=True,
-        index=True
+        index='trigram'
     )
     active = fields.Boolean(
         default=True,
@@ -45,8 +73,22 @@ class Person(models.AbstractModel):
     phone = fields.Char(tracking=True)
     mobile = fields.Char(tracking=True)
     email = fields.Char(tracking=True)
+    phone_normalized = fields.Char(
+        compute='_compute_phone_normalized',
+        store=True,
+        precompute=True,
+        help='Digits of the phone number, used for caller ID lookup'
+    )
+    mobile_normalized = fields.Char(
+        compute='_compute_phone_normalized',
+        store=True,
+        precompute=True,
+        help='Digits of the mobile number, used for caller ID lookup'
+    )
 
-    # Standard Odoo image fields
+    # Standard Odoo image fields. The photo is stored as an attachment and
+    # thumbnails are resized on demand, lists and the /hr_hospital/image
+    # route only need the checksum.
     image_1920 = fields.Image(
         "Image",
         max_width=1920,
@@ -56,9 +98,79 @@ class Person(models.AbstractModel):
         "Image (128)",
         related='image_1920',
         max_width=128,
-        max_height=128,
-        store=True
+        max_height=128
     )
+    image_checksum = fields.Char(
+        compute='_compute_image_checksum',
+        store=True,
+        help='SHA-1 of the photo, used to cache it in browsers'
+    )
+
+    def init(self):
+        # text_pattern_ops serves both the exact caller ID lookup and the
+        # prefix match of typed phone numbers, whatever the collation
+        for field_name in ('phone_normalized', 'mobile_normalized'):
+            create_index(
+                self.env.cr,
+                '%s_%s_index' % (self._table, field_name),
+                self._table,
+                ['%s text_pattern_ops' % field_name])
+
+    @api.model
+    def bulk_import(self, vals_list, chunk_size=BULK_IMPORT_CHUNK_SIZE,
+                    summary_thread=None):
+        """Create many records without the chatter overhead of mail.thread.
+
+        This is the entry point for synchronizations and imports. Records
+        are created in chunks under BULK_IMPORT_CONTEXT, which disables
+        field tracking, the creation message and auto-subscription of the
+        creating user, and defers the slot generation of physicians to the
+        schedule roll-out job. The same context can be passed to other
+        writes of a synchronization through
+        ``with_context(**BULK_IMPORT_CONTEXT)``.
+
+        Each chunk is flushed and the cache cleared, so memory does not grow
+        with the number of rows.
+
+        Args:
+            vals_list (list): Values of the records to create
+            chunk_size (int): Number of records created per batch
+            summary_thread (record): Optional mail.thread record, such as a
+                discuss channel, that receives one summary note per chunk
+
+        Returns:
+            dict: ids of the created records, count, seconds and
+            rows_per_second
+        """
+        records = self.with_context(**BULK_IMPORT_CONTEXT)
+        ids = []
+        started = perf_counter()
+        for start in range(0, len(vals_list), chunk_size):
+            chunk_started = perf_counter()
+            chunk = records.create(vals_list[start:start + chunk_size])
+            ids.extend(chunk.ids)
+            self.env.flush_all()
+            self.env.invalidate_all()
+            if summary_thread:
+                summary_thread.message_post(body=_(
+                    'Bulk import: %(count)s %(model)s records created in '
+                    '%(seconds).2f seconds') % {
+                        'count': len(chunk),
+                        'model': self._description,
+                        'seconds': perf_counter() - chunk_started,
+                    })
+
+        seconds = perf_counter() - started
+        rows_per_second = len(ids) / seconds if seconds else 0.0
+        _logger.info(
+            'Bulk imported %s %s records in %.2fs (%.0f rows/s)',
+            len(ids), self._name, seconds, rows_per_second)
+        return {
+            'ids': ids,
+            'count': len(ids),
+            'seconds': seconds,
+            'rows_per_second': rows_per_second,
+        }
 
     @api.depends('name_first', 'name_last')
     def _compute_display_name(self):
@@ -67,6 +179,89 @@ class Person(models.AbstractModel):
                 filter(None, [record.name_first, record.name_last])
             ) or _("Unnamed")
 
+    @api.depends('image_1920')
+    def _compute_image_checksum(self):
+        """Hash the photo like its attachment, so both checksums match."""
+        for record in self.with_context(bin_size=False):
+            record.image_checksum = record.image_1920 and hashlib.sha1(
+                base64.b64decode(record.image_1920)).hexdigest()
+
+    @api.depends('phone', 'mobile')
+    def _compute_phone_normalized(self):
+        for record in self:
+            record.phone_normalized = normalize_phone(record.phone) or False
+            record.mobile_normalized = normalize_phone(record.mobile) or False
+
+    @api.model
+    def _get_name_search_domain(self, name):
+        """Return the domain matching a typed name or phone number.
+
+        Every word must appear in the full name, in any order, so
+        "doe jane" finds Jane Doe. Terms made of digits and phone
+        punctuation also match the start of the normalized numbers.
+        """
+        domain = expression.AND([
+            [('display_name', 'ilike', word)] for word in name.split()
+        ])
+        digits = normalize_phone(name)
+        if len(digits) >= PHONE_SEARCH_MIN_DIGITS \
+                and not any(char.isalpha() for char in name):
+            domain = expression.OR([
+                domain,
+                [('phone_normalized', '=like', digits + '%')],
+                [('mobile_normalized', '=like', digits + '%')],
+            ])
+        return domain
+
+    @api.model
+    def _name_search(self, name, domain=None, operator='ilike', limit=None,
+                     order=None):
+        """Search people by name or phone, best matches first.
+
+        The ilike conditions are served by the trigram indexes of the name
+        fields when the pg_trgm extension is installed, and the matches are
+        ranked by their similarity to the typed term unless the caller asks
+        for a specific order. Without pg_trgm, the fields get regular
+        indexes and the requested or default order is kept.
+        """
+        name = (name or '').strip()
+        if operator != 'ilike' or not name:
+            return super()._name_search(
+                name, domain, operator=operator, limit=limit, order=order)
+
+        query = self._search(
+            expression.AND([domain or [], self._get_name_search_domain(name)]),
+            limit=limit, order=order)
+        # name_search passes the model's default order, which is not an
+        # explicit choice of the caller
+        if self.pool.has_trigram and (not order or order == self._order):
+            query.order = SQL(
+                'similarity(%s, %s) DESC, %s',
+                SQL.identifier(query.table, 'display_name'),
+                name,
+                SQL.identifier(query.table, 'id'),
+            )
+        return query
+
+    @api.model
+    def find_by_phone(self, phone, limit=10):
+        """Find the people a phone number belongs to, for caller ID.
+
+        Args:
+            phone (str): Phone number in any format
+            limit (int): Maximum number of records returned
+
+        Returns:
+            recordset: People whose phone or mobile has the same digits
+        """
+        digits = normalize_phone(phone)
+        if not digits:
+            return self.browse()
+        return self.search([
+            '|', ('phone_normalized', '=', digits),
+            ('mobile_normalized', '=', digits),
+        ], limit=limit)
+
     def _validate_appointment_time(self, appointment_time):
         """Validate appointment time format and range.
 
@@ -123,13 +318,16 @@ class Person(models.AbstractModel):
         return [
             ('physician_id', '=', physician_id),
             ('appointment_date', '=', appointment_date),
-            ('appointment_time', '=', appointment_time),
-            ('state', 'not in', ['cancelled'])
+            ('appointment_minute', '=', time_to_minute(appointment_time)),
+            ('state', 'not in', ['cancelled', 'no_show'])
         ]
 
     def _check_appointment_conflict(self, physician_id, appointment_date, appointment_time):
         """Check for appointment conflicts.
 
+        The check is a single read of the physician day bitmap, which is
+        kept in sync by schedule and visit changes.
+
         Args:
             physician_id (int): ID of the physician
             appointment_date (date): The appointment date
@@ -138,12 +336,5 @@ class Person(models.AbstractModel):
         Returns:
             bool: True if conflict exists, False otherwise
         """
-        domain = self._get_appointment_domain(
-            physician_id, appointment_date, appointment_time
-        )
-
-        # Check both schedule and visits
-        schedule = self.env['hr.hospital.physician.schedule'].search_count(domain)
-        visits = self.env['hr.hospital.patient.visits'].search_count(domain)
-
-        return bool(schedule or visits)
+        physician = self.env['hr.hospital.physician'].browse(physician_id)
+        return physician._is_slot_booked(appointment_date, appointment_time)
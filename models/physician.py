@@ -1,8 +1,13 @@
 import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
 
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+from .time_validation_mixin import time_to_minute
+
 _logger = logging.getLogger(__name__)
 
 
@@ -31,6 +36,24 @@ class Physician(models.Model):
         'res.users',
         string='Related User'
     )
+    schedule_template_id = fields.Many2one(
+        'hr.hospital.schedule.template',
+        string='Schedule Template',
+        help='When set, availability is computed on the fly from the '
+        'template rules and exceptions instead of generated schedule slots'
+    )
+    schedule_exception_ids = fields.One2many(
+        'hr.hospital.schedule.exception',
+        'physician_id',
+        string='Schedule Exceptions'
+    )
+    schedule_materialized_until = fields.Date(
+        string='Schedule Materialized Until',
+        readonly=True,
+        copy=False,
+        help='Last day up to which the rolling-horizon job has generated '
+        'schedule slots'
+    )
 
     @api.constrains('is_intern', 'mentor_id')
     def _check_intern_mentor_constraints(self):
@@ -51,13 +74,64 @@ class Physician(models.Model):
     @api.model_create_multi
     def create(self, vals_list):
         records = super().create(vals_list)
-        for record in records:
-            if not record.is_intern:
+        # Template-based schedules are computed, not generated
+        to_schedule = records.filtered(
+            lambda r: not r.is_intern and not r.schedule_template_id)
+        if to_schedule and self._is_schedule_generation_deferred():
+            to_schedule._queue_schedule_generation()
+        else:
+            for record in to_schedule:
                 self.env[
                     'hr.hospital.physician.schedule'
                     ].generate_slots_for_physician(record.id)
         return records
 
+    @api.model
+    def _is_schedule_generation_deferred(self):
+        """Whether new physicians get their slots from a background batch.
+
+        The defer_schedule_generation context key takes precedence over the
+        hr_hospital.defer_schedule_generation system parameter.
+        """
+        if 'defer_schedule_generation' in self.env.context:
+            return bool(self.env.context['defer_schedule_generation'])
+        param = self.env['ir.config_parameter'].sudo().get_param(
+            'hr_hospital.defer_schedule_generation', 'False')
+        return param.lower() in ('1', 'true')
+
+    def _queue_schedule_generation(self, target_date=None):
+        """Queue the slots of these physicians as one roll-out job.
+
+        The target date is stored on the job, so the roll-out cron generates
+        that day whenever it runs, even after midnight.
+
+        Args:
+            target_date (date): Day to generate, defaults to the current
+                day in the user's timezone
+
+        Returns:
+            record: The queued hr.hospital.schedule.rollout
+        """
+        target_date = target_date or fields.Date.context_today(self)
+        # Don't generate slots for weekends
+        if not self or target_date.weekday() > 4:
+            return self.env['hr.hospital.schedule.rollout']
+
+        rollout = self.env['hr.hospital.schedule.rollout'].sudo().create({
+            'name': _('New physicians %s') % target_date,
+            'date_from': target_date,
+            'date_to': target_date,
+            'even_week_morning': True,
+            'even_week_afternoon': True,
+            'odd_week_morning': True,
+            'odd_week_afternoon': True,
+            'line_ids': [(0, 0, {
+                'physician_id': physician.id,
+            }) for physician in self],
+        })
+        self.env.ref('hr_hospital.ir_cron_schedule_rollout')._trigger()
+        return rollout
+
     def generate_schedule_slots(self):
         """Action to generate schedule slots for the physician."""
         self.ensure_one()
@@ -67,3 +141,212 @@ class Physician(models.Model):
         self.env[
             'hr.hospital.physician.schedule'].generate_slots_for_physician(
             self.id)
+
+    def _get_virtual_slots(self, date_from, date_to):
+        """Compute the physician's working slots from the template rules.
+
+        Extra hours are added on top of the weekly rules and absences are
+        removed, so nothing needs to be stored per slot.
+
+        Returns:
+            set: (date, float time) pairs within the range
+        """
+        self.ensure_one()
+        if not self.schedule_template_id:
+            return set()
+
+        slot_keys = self.schedule_template_id._expand_slots(date_from, date_to)
+        exceptions = self.env['hr.hospital.schedule.exception'].search([
+            ('physician_id', '=', self.id),
+            ('date_from', '<=', date_to),
+            ('date_to', '>=', date_from),
+        ])
+        slot_keys |= exceptions.filtered(
+            lambda e: e.exception_type == 'extra'
+        )._expand_slots(date_from, date_to)
+        slot_keys -= exceptions.filtered(
+            lambda e: e.exception_type == 'absence'
+        )._expand_slots(date_from, date_to)
+        return slot_keys
+
+    @api.model
+    def _match_virtual_slots(self, slot_keys):
+        """Return the (physician_id, date, minute) keys that fall on the
+        virtual slots of their template-based physicians.
+
+        The template rules and the schedule exceptions of all physicians
+        are read with one search_read each and matched in memory, only
+        for the requested dates.
+        """
+        if not slot_keys:
+            return set()
+        Schedule = self.env['hr.hospital.physician.schedule']
+        template_ids = {
+            physician.id: physician.schedule_template_id.id
+            for physician in self.browse({key[0] for key in slot_keys})
+        }
+        dates = [key[1] for key in slot_keys]
+
+        rules_by_template = defaultdict(list)
+        for rule in self.env['hr.hospital.schedule.template.rule'].search_read(
+                [('template_id', 'in', list(set(template_ids.values())))],
+                ['template_id', 'weekday', 'week_type',
+                 'time_from', 'time_to']):
+            rules_by_template[rule['template_id'][0]].append(rule)
+        exceptions_by_physician = defaultdict(list)
+        for exception in self.env[
+                'hr.hospital.schedule.exception'].search_read([
+                    ('physician_id', 'in', list(template_ids)),
+                    ('date_from', '<=', max(dates)),
+                    ('date_to', '>=', min(dates)),
+                ], ['physician_id', 'exception_type', 'date_from', 'date_to',
+                    'time_from', 'time_to']):
+            exceptions_by_physician[exception['physician_id'][0]].append(
+                exception)
+
+        range_minutes = {}
+
+        def covers(entry, minute):
+            time_range = (entry['time_from'], entry['time_to'])
+            if time_range not in range_minutes:
+                range_minutes[time_range] = {
+                    time_to_minute(slot_time)
+                    for slot_time in Schedule._get_time_slots(*time_range)
+                }
+            return minute in range_minutes[time_range]
+
+        matched = set()
+        for physician_id, slot_date, minute in slot_keys:
+            is_even = slot_date.isocalendar()[1] % 2 == 0
+            working = any(
+                int(rule['weekday']) == slot_date.weekday()
+                and (rule['week_type'] == 'all'
+                     or (rule['week_type'] == 'even') == is_even)
+                and covers(rule, minute)
+                for rule in rules_by_template[template_ids[physician_id]])
+            for exception in exceptions_by_physician[physician_id]:
+                if not exception['date_from'] <= slot_date \
+                        <= exception['date_to'] \
+                        or slot_date.weekday() > 4 \
+                        or not covers(exception, minute):
+                    continue
+                if exception['exception_type'] == 'absence':
+                    working = False
+                    break
+                working = True
+            if working:
+                matched.add((physician_id, slot_date, minute))
+        return matched
+
+    def _get_schedule_slot_keys(self, date_from, date_to):
+        """Return the physician's working (date, minute of day) pairs in the
+        range, either computed from the template or read from generated
+        slots."""
+        self.ensure_one()
+        if self.schedule_template_id:
+            return {
+                (slot_date, time_to_minute(slot_time))
+                for slot_date, slot_time in self._get_virtual_slots(
+                    date_from, date_to)
+            }
+        return self.env[
+            'hr.hospital.physician.schedule'
+        ]._get_existing_slot_keys(self.id, date_from, date_to)
+
+    def _has_schedule_slot(self, appointment_date, appointment_time):
+        """Check whether the physician works at the given date and time."""
+        self.ensure_one()
+        return (appointment_date, time_to_minute(appointment_time)) in \
+            self._get_schedule_slot_keys(appointment_date, appointment_date)
+
+    def _get_available_slots(self, date_from, date_to):
+        """Return the sorted (date, time) slots not booked by any visit."""
+        self.ensure_one()
+        booked = {
+            (visit['appointment_date'], visit['appointment_minute'])
+            for visit in self.env['hr.hospital.patient.visits'].search_read([
+                ('physician_id', '=', self.id),
+                ('appointment_date', '>=', date_from),
+                ('appointment_date', '<=', date_to),
+                ('state', 'not in', ['cancelled', 'no_show']),
+            ], ['appointment_date', 'appointment_minute'])
+        }
+        return sorted(
+            (slot_date, minute / 60)
+            for slot_date, minute in self._get_schedule_slot_keys(
+                date_from, date_to) - booked)
+
+    def _get_free_slot_times(self, day):
+        """Return the free slot times of the physician on the given day,
+        read from the single physician day bitmap row."""
+        self.ensure_one()
+        PhysicianDay = self.env['hr.hospital.physician.day']
+        slot_mask, booked_mask = PhysicianDay._get_masks(self, day)
+        return PhysicianDay._mask_to_times(slot_mask & ~booked_mask)
+
+    def _is_slot_booked(self, day, appointment_time):
+        """Check in constant time whether a non-cancelled visit holds the
+        slot."""
+        self.ensure_one()
+        PhysicianDay = self.env['hr.hospital.physician.day']
+        _slot_mask, booked_mask = PhysicianDay._get_masks(self, day)
+        return bool(booked_mask & PhysicianDay._slot_bit(appointment_time))
+
+    @api.model
+    def _get_schedule_horizon_weeks(self):
+        """Number of weeks of schedule kept materialized ahead of today."""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'hr_hospital.schedule_horizon_weeks', 4))
+
+    @api.model
+    def _cron_materialize_schedule_horizon(self):
+        """Keep every non-intern physician's schedule generated N weeks ahead.
+
+        The schedule_materialized_until watermark makes each run generate
+        only the days that entered the horizon since the previous run. Each
+        physician runs in its own savepoint: a failure is logged and leaves
+        that physician's watermark unchanged, so the others still advance
+        and only the failed days are retried on the next run.
+        """
+        Schedule = self.env['hr.hospital.physician.schedule']
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        today = fields.Date.today()
+        horizon_end = today + timedelta(
+            weeks=self._get_schedule_horizon_weeks())
+
+        physicians = self.search([
+            ('is_intern', '=', False),
+            ('schedule_template_id', '=', False),
+            '|',
+            ('schedule_materialized_until', '=', False),
+            ('schedule_materialized_until', '<', horizon_end),
+        ])
+        slots_created = 0
+        failed = 0
+        for physician in physicians:
+            start_date = today
+            if physician.schedule_materialized_until:
+                start_date = max(
+                    today,
+                    physician.schedule_materialized_until + timedelta(days=1))
+            try:
+                with self.env.cr.savepoint():
+                    created = Schedule.generate_slots(
+                        physician.id, start_date, horizon_end)
+                    physician.schedule_materialized_until = horizon_end
+            except Exception as e:
+                _logger.warning(
+                    'Schedule horizon failed for physician %s: %s',
+                    physician.id, e)
+                physician.invalidate_recordset(['schedule_materialized_until'])
+                failed += 1
+                continue
+            slots_created += created
+            if auto_commit:
+                self.env.cr.commit()
+
+        _logger.info(
+            'Schedule horizon: %d slots created for %d physicians up to %s, '
+            '%d failed',
+            slots_created, len(physicians) - failed, horizon_end, failed)
+        return slots_created
@@ -1,6 +1,7 @@
 import logging
 
 from odoo import models, fields
+from odoo.tools.sql import create_index
 
 _logger = logging.getLogger(__name__)
 
@@ -26,3 +27,11 @@ class PhysicianChangeHistory(models.Model):
         required=True,
         index=True,
     )
+
+    def init(self):
+        # Serves the pages of the patient timeline
+        create_index(
+            self.env.cr,
+            'hr_hospital_physician_change_history_timeline_index',
+            self._table,
+            ['patient_id', 'date_established', 'id'])
@@ -0,0 +1,194 @@
+import logging
+
+from odoo import models, fields, api
+
+from .time_validation_mixin import (
+    FIRST_SLOT_MINUTE, SLOT_MINUTES, time_to_minute)
+
+_logger = logging.getLogger(__name__)
+
+# Half-hour slots from 8:00 to 17:30, one bit each
+FIRST_SLOT_TIME = 8.0
+SLOT_COUNT = 20
+FULL_DAY_MASK = (1 << SLOT_COUNT) - 1
+
+# Which of a set of (physician_id, date, minute) keys currently hold a
+# schedule slot, respectively an active booking
+_HELD_KEYS_QUERIES = {
+    'slot_mask': """
+        SELECT k.physician_id, k.day, k.minute
+        FROM unnest(%s::int[], %s::date[], %s::int[])
+            AS k (physician_id, day, minute)
+        WHERE EXISTS (
+            SELECT 1 FROM hr_hospital_physician_schedule
+            WHERE physician_id = k.physician_id
+            AND appointment_date = k.day
+            AND appointment_minute = k.minute)
+    """,
+    'booked_mask': """
+        SELECT k.physician_id, k.day, k.minute
+        FROM unnest(%s::int[], %s::date[], %s::int[])
+            AS k (physician_id, day, minute)
+        WHERE EXISTS (
+            SELECT 1 FROM hr_hospital_patient_visits
+            WHERE physician_id = k.physician_id
+            AND appointment_date = k.day
+            AND appointment_minute = k.minute
+            AND state NOT IN ('cancelled', 'no_show'))
+    """,
+}
+
+
+class PhysicianDay(models.Model):
+    _name = 'hr.hospital.physician.day'
+    _description = 'Physician Day Availability'
+    _order = 'day, physician_id'
+    _sql_constraints = [
+        ('unique_physician_day',
+         'UNIQUE(physician_id, day)',
+         'Availability for this physician and day already exists!')
+    ]
+
+    physician_id = fields.Many2one(
+        'hr.hospital.physician',
+        string='Physician',
+        required=True,
+        ondelete='cascade'
+    )
+    day = fields.Date(required=True)
+    slot_mask = fields.Integer(
+        default=0,
+        help='Bit n is set when the slot at 8:00 + n * 30 minutes exists '
+        'in the physician\'s schedule'
+    )
+    booked_mask = fields.Integer(
+        default=0,
+        help='Bit n is set when the slot at 8:00 + n * 30 minutes is booked '
+        'by an active visit'
+    )
+
+    @api.model
+    def _minute_bit(self, minute):
+        """Return the bit of the half-hour slot starting at the given minute
+        of day, or 0 when it is not on the 8:00-17:30 half-hour grid."""
+        index, remainder = divmod(minute - FIRST_SLOT_MINUTE, SLOT_MINUTES)
+        if remainder or not 0 <= index < SLOT_COUNT:
+            return 0
+        return 1 << index
+
+    @api.model
+    def _slot_bit(self, appointment_time):
+        """Return the bit of the half-hour slot starting at the given time,
+        or 0 when the time is not on the 8:00-17:30 half-hour grid."""
+        return self._minute_bit(time_to_minute(appointment_time))
+
+    @api.model
+    def _mask_to_times(self, mask):
+        """Return the slot times whose bits are set in the mask."""
+        return [
+            FIRST_SLOT_TIME + index / 2
+            for index in range(SLOT_COUNT)
+            if mask & (1 << index)
+        ]
+
+    @api.model
+    def _update_bits(self, mask_field, slot_keys):
+        """Set or clear the bits of the given (physician_id, date, minute)
+        keys in one of the masks.
+
+        Only the touched bits change: the bits of keys that still hold a
+        slot (slot_mask) or an active booking (booked_mask) are OR-ed into
+        their row with INSERT ... ON CONFLICT, the others are cleared with
+        an AND NOT. The rest of the day is never rebuilt, so concurrent
+        changes to other slots of the same day do not overwrite each other.
+
+        Args:
+            mask_field (str): 'slot_mask' or 'booked_mask'
+            slot_keys (iterable): (physician_id, date, minute) keys
+        """
+        slot_keys = {
+            (physician_id, day, minute)
+            for physician_id, day, minute in slot_keys
+            if physician_id and day and self._minute_bit(minute)
+        }
+        if not slot_keys:
+            return
+        self.env['hr.hospital.physician.schedule'].flush_model([
+            'physician_id', 'appointment_date', 'appointment_minute'])
+        self.env['hr.hospital.patient.visits'].flush_model([
+            'physician_id', 'appointment_date', 'appointment_minute', 'state'])
+        self.env.cr.execute(_HELD_KEYS_QUERIES[mask_field], [
+            list(column) for column in zip(*slot_keys)])
+        held = set(self.env.cr.fetchall())
+
+        set_bits, clear_bits = {}, {}
+        for physician_id, day, minute in slot_keys:
+            bits = set_bits if (physician_id, day, minute) in held \
+                else clear_bits
+            bits[physician_id, day] = bits.get((physician_id, day), 0) \
+                | self._minute_bit(minute)
+
+        if clear_bits:
+            physician_ids, days = zip(*clear_bits)
+            masks = list(clear_bits.values())
+            self.env.cr.execute("""
+                UPDATE hr_hospital_physician_day d
+                SET {mask} = d.{mask} & ~k.bits,
+                    write_uid = %s, write_date = NOW() AT TIME ZONE 'UTC'
+                FROM unnest(%s::int[], %s::date[], %s::int[])
+                    AS k (physician_id, day, bits)
+                WHERE d.physician_id = k.physician_id
+                AND d.day = k.day
+                AND d.{mask} & k.bits != 0
+            """.format(mask=mask_field), (
+                self.env.uid, list(physician_ids), list(days), list(masks)))
+        if set_bits:
+            physician_ids, days = zip(*set_bits)
+            masks = list(set_bits.values())
+            self.env.cr.execute("""
+                INSERT INTO hr_hospital_physician_day AS d (
+                    physician_id, day, slot_mask, booked_mask,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT k.physician_id, k.day, {slot_bits}, {booked_bits},
+                       %(uid)s, NOW() AT TIME ZONE 'UTC',
+                       %(uid)s, NOW() AT TIME ZONE 'UTC'
+                FROM unnest(%(physician_ids)s::int[], %(days)s::date[],
+                            %(masks)s::int[]) AS k (physician_id, day, bits)
+                ON CONFLICT (physician_id, day) DO UPDATE SET
+                    {mask} = d.{mask} | EXCLUDED.{mask},
+                    write_uid = EXCLUDED.write_uid,
+                    write_date = EXCLUDED.write_date
+                WHERE d.{mask} & EXCLUDED.{mask} != EXCLUDED.{mask}
+            """.format(
+                mask=mask_field,
+                slot_bits='k.bits' if mask_field == 'slot_mask' else '0',
+                booked_bits='k.bits' if mask_field == 'booked_mask' else '0',
+            ), {
+                'uid': self.env.uid,
+                'physician_ids': list(physician_ids),
+                'days': list(days),
+                'masks': list(masks),
+            })
+        self.invalidate_model([mask_field])
+
+    @api.model
+    def _get_masks(self, physician, day):
+        """Read the (slot_mask, booked_mask) of a physician day in one query.
+
+        For template-based physicians the slot mask is derived from the
+        template rules, as their slots are not stored.
+        """
+        self.flush_model(['slot_mask', 'booked_mask'])
+        self.env.cr.execute("""
+            SELECT slot_mask, booked_mask
+            FROM hr_hospital_physician_day
+            WHERE physician_id = %s AND day = %s
+        """, (physician.id, day))
+        row = self.env.cr.fetchone()
+        slot_mask, booked_mask = row or (0, 0)
+        if physician.schedule_template_id:
+            slot_mask = 0
+            for _day, slot_time in physician._get_virtual_slots(day, day):
+                slot_mask |= self._slot_bit(slot_time)
+        return slot_mask, booked_mask
@@ -2,6 +2,40 @@ from datetime import timedelta, date
 from calendar import monthrange
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
+
+from .time_validation_mixin import time_to_minute
+
+# Recount the active (not cancelled nor no-show) visits of the slots matching a set of
+# (physician_id, date, minute) keys and store the derived availability.
+_AVAILABILITY_QUERY = """
+    UPDATE hr_hospital_physician_schedule s
+    SET active_visit_count = c.visit_count,
+        is_available = c.visit_count = 0
+    FROM (
+        SELECT slot.id, COUNT(v.id) AS visit_count
+        FROM hr_hospital_physician_schedule slot
+        JOIN ({keys}) AS k (physician_id, appointment_date, appointment_minute)
+            ON slot.physician_id = k.physician_id
+            AND slot.appointment_date = k.appointment_date
+            AND slot.appointment_minute = k.appointment_minute
+        LEFT JOIN hr_hospital_patient_visits v
+            ON v.physician_id = slot.physician_id
+            AND v.appointment_date = slot.appointment_date
+            AND v.appointment_minute = slot.appointment_minute
+            AND v.state NOT IN ('cancelled', 'no_show')
+        GROUP BY slot.id
+    ) c
+    WHERE s.id = c.id
+    AND (s.active_visit_count IS DISTINCT FROM c.visit_count
+         OR s.is_available IS DISTINCT FROM (c.visit_count = 0))
+"""
+
+# Time windows for next-available-slot searches, [start, end) in minutes
+SLOT_WINDOWS = {
+    'morning': (8 * 60, 13 * 60),
+    'afternoon': (13 * 60, 18 * 60),
+}
 
 
 class PhysicianSchedule(models.Model):
@@ -10,7 +44,7 @@ class PhysicianSchedule(models.Model):
     _inherit = ['hr.hospital.time.validation.mixin']
     _sql_constraints = [
         ('unique_physician_datetime',
-         'UNIQUE(physician_id, appointment_date, appointment_time)',
+         'UNIQUE(physician_id, appointment_date, appointment_minute)',
          'This time slot is already scheduled for this physician!')
     ]
 
@@ -28,26 +62,121 @@ class PhysicianSchedule(models.Model):
         required=True,
         help='24-hour format (e.g., 13.5 for 1:30 PM)'
     )
+    appointment_minute = fields.Integer(
+        string='Minute of Day',
+        compute='_compute_appointment_minute',
+        store=True,
+        precompute=True,
+        help='Appointment time in minutes since midnight, used for slot '
+        'lookups and range scans'
+    )
     visit_ids = fields.One2many(
         'hr.hospital.patient.visits',
         'schedule_id',
         string='Visits',
         help='Visits scheduled for this time slot'
     )
+    active_visit_count = fields.Integer(
+        string='Active Visits',
+        default=0,
+        readonly=True,
+        help='Number of active visits booked in this time slot, cancelled '
+        'and no-show visits excluded'
+    )
     is_available = fields.Boolean(
         string='Is Available',
-        compute='_compute_is_available',
+        default=True,
+        readonly=True,
         help='Indicates if this time slot is available for scheduling'
     )
 
-    @api.depends('visit_ids.state')
-    def _compute_is_available(self):
+    @api.depends('appointment_time')
+    def _compute_appointment_minute(self):
         for record in self:
-            # A slot is available if it has no visits
-            # or all visits are cancelled
-            record.is_available = not bool(record.visit_ids.filtered(
-                lambda v: v.state != 'cancelled'
-            ))
+            record.appointment_minute = time_to_minute(
+                record.appointment_time)
+
+    def init(self):
+        # Serves the date-ordered scans of the next-available-slot search
+        create_index(
+            self.env.cr,
+            'hr_hospital_physician_schedule_date_minute_index',
+            self._table,
+            ['appointment_date', 'appointment_minute'])
+        # Serves "free slots of a physician" searches and filters
+        create_index(
+            self.env.cr,
+            'hr_hospital_physician_schedule_availability_index',
+            self._table,
+            ['physician_id', 'appointment_date', 'is_available'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        # Visits booked before their slot existed are linked to it now
+        self.env['hr.hospital.patient.visits']._link_schedule_slots(
+            records.ids)
+        slot_keys = records._get_slot_keys()
+        # Slots created after their visits start out occupied
+        self._refresh_availability(slot_keys)
+        self.env['hr.hospital.physician.day']._update_bits(
+            'slot_mask', slot_keys)
+        return records
+
+    def write(self, vals):
+        slot_fields = {'physician_id', 'appointment_date', 'appointment_time'}
+        old_keys = self._get_slot_keys() \
+            if slot_fields & set(vals) else set()
+        res = super().write(vals)
+        if old_keys:
+            self.env['hr.hospital.patient.visits']._link_schedule_slots(
+                self.ids)
+            slot_keys = old_keys | self._get_slot_keys()
+            self._refresh_availability(slot_keys)
+            self.env['hr.hospital.physician.day']._update_bits(
+                'slot_mask', slot_keys)
+        return res
+
+    def unlink(self):
+        slot_keys = self._get_slot_keys()
+        res = super().unlink()
+        self.env['hr.hospital.physician.day']._update_bits(
+            'slot_mask', slot_keys)
+        return res
+
+    def action_link_visits(self):
+        """Link the visits booked on these slots before they existed."""
+        self.env['hr.hospital.patient.visits']._link_schedule_slots(self.ids)
+        return True
+
+    def _get_slot_keys(self):
+        """Return the (physician_id, date, minute) keys of these slots."""
+        return {
+            (record.physician_id.id, record.appointment_date,
+             record.appointment_minute)
+            for record in self
+        }
+
+    @api.model
+    def _refresh_availability(self, slot_keys):
+        """Recount active visits of the slots matching the given
+        (physician_id, date, minute) keys with one UPDATE.
+
+        Only the touched slots are recounted, so visit changes keep the
+        stored availability current without a per-record compute.
+        """
+        slot_keys = {key for key in slot_keys if all(key)}
+        if not slot_keys:
+            return
+        self.flush_model([
+            'physician_id', 'appointment_date', 'appointment_minute'])
+        self.env['hr.hospital.patient.visits'].flush_model([
+            'physician_id', 'appointment_date', 'appointment_minute', 'state'])
+        physician_ids, dates, minutes = zip(*slot_keys)
+        self.env.cr.execute(_AVAILABILITY_QUERY.format(keys="""
+            SELECT * FROM unnest(%s::int[], %s::date[], %s::int[])
+        """), (list(physician_ids), list(dates), list(minutes)))
+        self.invalidate_model(['active_visit_count', 'is_available'])
 
     @api.constrains('appointment_time')
     def _check_appointment_time(self):
@@ -56,7 +185,11 @@ class PhysicianSchedule(models.Model):
 
     @api.model
     def generate_slots(self, physician_id, start_date, end_date=None):
-        """Generate slots for a physician between start_date and end_date."""
+        """Generate slots for a physician between start_date and end_date.
+
+        Returns:
+            int: Number of slots created
+        """
         # Check if physician exists and is not an intern
         physician = self.env['hr.hospital.physician'].browse(physician_id)
         if not physician.exists():
@@ -74,33 +207,77 @@ class PhysicianSchedule(models.Model):
         if end_date < start_date:
             raise ValidationError(_('End date cannot be before start date'))
 
-        # Generate time slots from 8:00 to 17:30 with 30-minute intervals
-        time_slots = []
-        current_time = 8.0
-        while current_time < 18.0:
-            time_slots.append(current_time)
-            current_time += 0.5
-
-        # Generate slots for each day
+        # Build the full set of weekday slots for the range in memory
+        time_slots = self._get_time_slots()
+        slot_keys = []
         current_date = start_date
         while current_date <= end_date:
             # Skip weekends
             if current_date.weekday() <= 4:  # Monday to Friday
-                for time_slot in time_slots:
-                    # Check if slot already exists
-                    existing = self.search([
-                        ('physician_id', '=', physician_id),
-                        ('appointment_date', '=', current_date),
-                        ('appointment_time', '=', time_slot)
-                    ])
-                    if not existing:
-                        self.create({
-                            'physician_id': physician_id,
-                            'appointment_date': current_date,
-                            'appointment_time': time_slot
-                        })
+                slot_keys.extend(
+                    (current_date, time_slot) for time_slot in time_slots)
             current_date += timedelta(days=1)
-        return True
+
+        return len(self._create_missing_slots(physician_id, slot_keys))
+
+    @api.model
+    def _get_time_slots(self, start_time=8.0, end_time=18.0):
+        """Return half-hour slot times in [start_time, end_time)."""
+        slots = []
+        current_time = start_time
+        while current_time < end_time:
+            slots.append(current_time)
+            current_time += 0.5
+        return slots
+
+    @api.model
+    def _get_existing_slot_keys(self, physician_id, date_from, date_to):
+        """Fetch all (appointment_date, appointment_minute) pairs of a
+        physician within the date range in a single query."""
+        self.flush_model([
+            'physician_id', 'appointment_date', 'appointment_minute'])
+        self.env.cr.execute("""
+            SELECT appointment_date, appointment_minute
+            FROM hr_hospital_physician_schedule
+            WHERE physician_id = %s
+            AND appointment_date BETWEEN %s AND %s
+        """, (physician_id, date_from, date_to))
+        return set(self.env.cr.fetchall())
+
+    @api.model
+    def _create_missing_slots(self, physician_id, slot_keys):
+        """Create the slots from slot_keys that do not exist yet.
+
+        Existing slots are fetched with one query and the missing ones are
+        inserted with one batched create, so the cost no longer grows with
+        the number of round trips per slot. Slots are compared by minute of
+        day, so float rounding of the times never duplicates or misses one.
+
+        Args:
+            physician_id (int): ID of the physician
+            slot_keys (iterable): (date, float time) pairs to materialize
+
+        Returns:
+            recordset: The newly created schedule slots
+        """
+        missing = {
+            (slot_date, time_to_minute(slot_time)): (slot_date, slot_time)
+            for slot_date, slot_time in slot_keys
+        }
+        if not missing:
+            return self.browse()
+
+        dates = [slot_date for slot_date, _minute in missing]
+        for key in self._get_existing_slot_keys(
+                physician_id, min(dates), max(dates)):
+            missing.pop(key, None)
+
+        vals_list = [{
+            'physician_id': physician_id,
+            'appointment_date': slot_date,
+            'appointment_time': slot_time,
+        } for _key, (slot_date, slot_time) in sorted(missing.items())]
+        return self.create(vals_list)
 
     def generate_next_week_slots(self):
         """Generate slots for next week for this physician."""
@@ -156,3 +333,80 @@ class PhysicianSchedule(models.Model):
         except ValueError as e:
             raise ValidationError(
                 _('Invalid month/year combination: %s') % str(e))
+
+    @api.model
+    def find_next_available_slots(self, start=None, limit=10,
+                                  physician_ids=None, specialty=None,
+                                  window=None):
+        """Return the earliest free slots from a given moment.
+
+        Free slots are found with one query on the stored slot
+        availability, ordered and limited in the database.
+        Template-based physicians have no generated slots and are not
+        part of the result, book_slot rejects them for the same reason.
+
+        Args:
+            start (datetime): Local moment to search from, defaults to
+                now in the user's timezone
+            limit (int): Maximum number of slots to return
+            physician_ids (list): Restrict to these physicians
+            specialty (str): Restrict to physicians of this specialty
+            window (str): 'morning' or 'afternoon' to restrict slot times
+
+        Returns:
+            list: Dicts with schedule_id, physician_id, physician_name,
+            specialty, appointment_date and appointment_time
+        """
+        if window and window not in SLOT_WINDOWS:
+            raise ValidationError(_('Unknown time window: %s') % window)
+
+        # Slot dates and times are local, so is the start
+        start = start or fields.Datetime.context_timestamp(
+            self, fields.Datetime.now()).replace(tzinfo=None)
+        self.flush_model()
+        self.env['hr.hospital.physician'].flush_model([
+            'active', 'is_intern', 'specialty', 'display_name'])
+
+        conditions = []
+        params = {
+            'start_date': start.date(),
+            'start_minute': start.hour * 60 + start.minute,
+            'limit': limit,
+        }
+        if physician_ids:
+            conditions.append('s.physician_id = ANY(%(physician_ids)s)')
+            params['physician_ids'] = list(physician_ids)
+        if specialty:
+            conditions.append('p.specialty = %(specialty)s')
+            params['specialty'] = specialty
+        if window:
+            conditions.append(
+                's.appointment_minute >= %(minute_from)s '
+                'AND s.appointment_minute < %(minute_to)s')
+            params['minute_from'], params['minute_to'] = SLOT_WINDOWS[window]
+
+        self.env.cr.execute("""
+            SELECT s.id, s.physician_id, p.display_name, p.specialty,
+                   s.appointment_date, s.appointment_time
+            FROM hr_hospital_physician_schedule s
+            JOIN hr_hospital_physician p ON p.id = s.physician_id
+            WHERE p.active AND NOT COALESCE(p.is_intern, FALSE)
+            AND (s.appointment_date, s.appointment_minute)
+                >= (%(start_date)s, %(start_minute)s)
+            AND s.is_available
+            {conditions}
+            ORDER BY s.appointment_date, s.appointment_minute, s.physician_id
+            LIMIT %(limit)s
+        """.format(conditions=''.join(
+            ' AND ' + condition for condition in conditions)), params)
+
+        return [{
+            'schedule_id': schedule_id,
+            'physician_id': physician_id,
+            'physician_name': physician_name,
+            'specialty': physician_specialty,
+            'appointment_date': fields.Date.to_string(appointment_date),
+            'appointment_time': appointment_time,
+        } for (schedule_id, physician_id, physician_name, physician_specialty,
+               appointment_date, appointment_time)
+            in self.env.cr.fetchall()]
@@ -0,0 +1,175 @@
+import logging
+import threading
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
+
+
+class ScheduleRollout(models.Model):
+    _name = 'hr.hospital.schedule.rollout'
+    _description = 'Schedule Roll-out Job'
+    _inherit = ['hr.hospital.shift.pattern.mixin']
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(required=True)
+    date_from = fields.Date(string='From Date', required=True)
+    date_to = fields.Date(string='To Date', required=True)
+    clear_existing = fields.Boolean(
+        string='Clear Existing Slots',
+        help='If checked, existing slots in the date range will be removed '
+        'before generating new ones'
+    )
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Done with Errors'),
+    ], string='Status', default='queued', required=True, index=True)
+    line_ids = fields.One2many(
+        'hr.hospital.schedule.rollout.line',
+        'rollout_id',
+        string='Physicians'
+    )
+    line_count = fields.Integer(compute='_compute_progress')
+    done_count = fields.Integer(compute='_compute_progress')
+    failed_count = fields.Integer(compute='_compute_progress')
+    slots_created = fields.Integer(compute='_compute_progress')
+    progress = fields.Float(
+        compute='_compute_progress',
+        help='Percentage of processed physicians'
+    )
+
+    @api.depends('line_ids.state', 'line_ids.slots_created')
+    def _compute_progress(self):
+        for rollout in self:
+            lines = rollout.line_ids
+            processed = lines.filtered(lambda l: l.state != 'pending')
+            rollout.line_count = len(lines)
+            rollout.done_count = len(
+                processed.filtered(lambda l: l.state == 'done'))
+            rollout.failed_count = len(processed) - rollout.done_count
+            rollout.slots_created = sum(lines.mapped('slots_created'))
+            rollout.progress = (
+                100.0 * len(processed) / len(lines) if lines else 100.0)
+
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
+        for record in self:
+            if record.date_from > record.date_to:
+                raise ValidationError(_(
+                    'End date cannot be before start date'))
+
+    def _update_state(self):
+        """Derive the job state from the state of its lines."""
+        for rollout in self:
+            states = set(rollout.line_ids.mapped('state'))
+            if 'pending' in states:
+                state = 'running' if states - {'pending'} else 'queued'
+            elif 'failed' in states:
+                state = 'failed'
+            else:
+                state = 'done'
+            if rollout.state != state:
+                rollout.state = state
+
+    def action_retry_failed(self):
+        """Put failed physicians back in the queue."""
+        self.line_ids.filtered(lambda l: l.state == 'failed').write({
+            'state': 'pending',
+            'error_message': False,
+        })
+        self._update_state()
+        self.env.ref('hr_hospital.ir_cron_schedule_rollout')._trigger()
+
+    @api.model
+    def _cron_process_rollouts(self, batch_size=50):
+        """Process pending roll-out lines, one physician per transaction.
+
+        Each physician is committed separately so a large roll-out never
+        has to fit into a single request, and a failure only marks its own
+        line. When pending lines remain after the batch, the cron is
+        re-triggered to pick them up.
+        """
+        Line = self.env['hr.hospital.schedule.rollout.line']
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        lines = Line.search(
+            [('state', '=', 'pending')], limit=batch_size,
+            order='rollout_id, id')
+        for line in lines:
+            line._process()
+            line.rollout_id._update_state()
+            if auto_commit:
+                self.env.cr.commit()
+
+        if Line.search_count([('state', '=', 'pending')]):
+            self.env.ref('hr_hospital.ir_cron_schedule_rollout')._trigger()
+        return len(lines)
+
+
+class ScheduleRolloutLine(models.Model):
+    _name = 'hr.hospital.schedule.rollout.line'
+    _description = 'Schedule Roll-out Line'
+    _order = 'rollout_id, id'
+
+    rollout_id = fields.Many2one(
+        'hr.hospital.schedule.rollout',
+        string='Roll-out',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    physician_id = fields.Many2one(
+        'hr.hospital.physician',
+        string='Physician',
+        required=True
+    )
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, index=True)
+    slots_created = fields.Integer()
+    error_message = fields.Text(readonly=True)
+    date_processed = fields.Datetime(readonly=True)
+
+    def _process(self):
+        """Generate the roll-out pattern for this line's physician."""
+        self.ensure_one()
+        Schedule = self.env['hr.hospital.physician.schedule']
+        rollout = self.rollout_id
+        try:
+            with self.env.cr.savepoint():
+                if self.physician_id.is_intern:
+                    raise ValidationError(_(
+                        'Cannot generate schedule for interns'))
+                if rollout.clear_existing:
+                    Schedule.search([
+                        ('physician_id', '=', self.physician_id.id),
+                        ('appointment_date', '>=', rollout.date_from),
+                        ('appointment_date', '<=', rollout.date_to),
+                    ]).unlink()
+                created = Schedule._create_missing_slots(
+                    self.physician_id.id,
+                    rollout._get_pattern_slot_keys(
+                        rollout.date_from, rollout.date_to))
+        except Exception as e:
+            _logger.warning(
+                'Schedule roll-out %s failed for physician %s: %s',
+                rollout.id, self.physician_id.id, e)
+            self.write({
+                'state': 'failed',
+                'error_message': str(e),
+                'date_processed': fields.Datetime.now(),
+            })
+            return False
+
+        self.write({
+            'state': 'done',
+            'slots_created': len(created),
+            'error_message': False,
+            'date_processed': fields.Datetime.now(),
+        })
+        return True
@@ -0,0 +1,158 @@
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
+
+WEEKDAYS = [
+    ('0', 'Monday'),
+    ('1', 'Tuesday'),
+    ('2', 'Wednesday'),
+    ('3', 'Thursday'),
+    ('4', 'Friday'),
+]
+
+
+class ScheduleRangeMixin(models.AbstractModel):
+    _name = 'hr.hospital.schedule.range.mixin'
+    _description = 'Schedule Time Range Mixin'
+
+    time_from = fields.Float(
+        string='From',
+        required=True,
+        default=8.0,
+        help='24-hour format (e.g., 13.5 for 1:30 PM)'
+    )
+    time_to = fields.Float(
+        string='To',
+        required=True,
+        default=18.0,
+        help='24-hour format (e.g., 13.5 for 1:30 PM)'
+    )
+
+    @api.constrains('time_from', 'time_to')
+    def _check_time_range(self):
+        for record in self:
+            if record.time_from < 8 or record.time_to > 18:
+                raise ValidationError(_(
+                    'Working hours must be between 8:00 and 18:00'))
+            if record.time_from >= record.time_to:
+                raise ValidationError(_(
+                    'End time must be after start time'))
+            if record.time_from % 0.5 or record.time_to % 0.5:
+                raise ValidationError(_(
+                    'Working hours can only start and end at hour or '
+                    'half-hour intervals'))
+
+    def _get_time_slots(self):
+        """Return the half-hour slot times covered by this range."""
+        self.ensure_one()
+        return self.env['hr.hospital.physician.schedule']._get_time_slots(
+            self.time_from, self.time_to)
+
+
+class ScheduleTemplate(models.Model):
+    _name = 'hr.hospital.schedule.template'
+    _description = 'Schedule Template'
+
+    name = fields.Char(required=True)
+    active = fields.Boolean(default=True)
+    rule_ids = fields.One2many(
+        'hr.hospital.schedule.template.rule',
+        'template_id',
+        string='Working Hours',
+        copy=True
+    )
+    physician_ids = fields.One2many(
+        'hr.hospital.physician',
+        'schedule_template_id',
+        string='Physicians'
+    )
+
+    def _expand_slots(self, date_from, date_to):
+        """Expand the weekly rules into (date, time) pairs for the range."""
+        self.ensure_one()
+        slots_by_rule = {}
+        for rule in self.rule_ids:
+            slots_by_rule.setdefault(int(rule.weekday), []).append(
+                (rule.week_type, rule._get_time_slots()))
+
+        slot_keys = set()
+        current_date = date_from
+        while current_date <= date_to:
+            is_even = current_date.isocalendar()[1] % 2 == 0
+            for week_type, time_slots in slots_by_rule.get(
+                    current_date.weekday(), []):
+                if week_type == 'all' or \
+                   (week_type == 'even') == is_even:
+                    slot_keys.update(
+                        (current_date, time_slot) for time_slot in time_slots)
+            current_date += timedelta(days=1)
+        return slot_keys
+
+
+class ScheduleTemplateRule(models.Model):
+    _name = 'hr.hospital.schedule.template.rule'
+    _description = 'Schedule Template Rule'
+    _inherit = ['hr.hospital.schedule.range.mixin']
+    _order = 'template_id, weekday, time_from'
+
+    template_id = fields.Many2one(
+        'hr.hospital.schedule.template',
+        string='Template',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    weekday = fields.Selection(WEEKDAYS, required=True, default='0')
+    week_type = fields.Selection([
+        ('all', 'Every Week'),
+        ('even', 'Even Weeks (ISO)'),
+        ('odd', 'Odd Weeks (ISO)'),
+    ], required=True, default='all')
+
+
+class ScheduleException(models.Model):
+    _name = 'hr.hospital.schedule.exception'
+    _description = 'Schedule Exception'
+    _inherit = ['hr.hospital.schedule.range.mixin']
+    _order = 'date_from desc, time_from'
+
+    physician_id = fields.Many2one(
+        'hr.hospital.physician',
+        string='Physician',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    exception_type = fields.Selection([
+        ('absence', 'Absence'),
+        ('extra', 'Extra Hours'),
+    ], required=True, default='absence',
+        help='Absences remove working hours from the template, extra hours '
+        'add working hours on top of it')
+    date_from = fields.Date(string='From Date', required=True, index=True)
+    date_to = fields.Date(string='To Date', required=True, index=True)
+    reason = fields.Char()
+
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
+        for record in self:
+            if record.date_from > record.date_to:
+                raise ValidationError(_(
+                    'End date cannot be before start date'))
+
+    def _expand_slots(self, date_from, date_to):
+        """Expand the exceptions into (date, time) pairs within the range."""
+        slot_keys = set()
+        for exception in self:
+            time_slots = exception._get_time_slots()
+            current_date = max(exception.date_from, date_from)
+            while current_date <= min(exception.date_to, date_to):
+                if current_date.weekday() <= 4:  # Monday to Friday
+                    slot_keys.update(
+                        (current_date, time_slot) for time_slot in time_slots)
+                current_date += timedelta(days=1)
+        return slot_keys
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from odoo import models, fields
+
+
+class ShiftPatternMixin(models.AbstractModel):
+    _name = 'hr.hospital.shift.pattern.mixin'
+    _description = 'Shift Pattern Mixin'
+
+    # Even week schedule
+    even_week_morning = fields.Boolean(
+        string='Even Week Morning (8:00-13:00)',
+        default=True,
+        help='Schedule for morning shifts (8:00-13:00) on even weeks'
+    )
+    even_week_afternoon = fields.Boolean(
+        string='Even Week Afternoon (13:00-18:00)',
+        help='Schedule for afternoon shifts (13:00-18:00) on even weeks'
+    )
+    # Odd week schedule
+    odd_week_morning = fields.Boolean(
+        string='Odd Week Morning (8:00-13:00)',
+        help='Schedule for morning shifts (8:00-13:00) on odd weeks'
+    )
+    odd_week_afternoon = fields.Boolean(
+        string='Odd Week Afternoon (13:00-18:00)',
+        default=True,
+        help='Schedule for afternoon shifts (13:00-18:00) on odd weeks'
+    )
+
+    def _get_time_slots(self, is_morning):
+        """Generate time slots for morning or afternoon shift."""
+        Schedule = self.env['hr.hospital.physician.schedule']
+        if is_morning:
+            return Schedule._get_time_slots(8.0, 13.0)
+        return Schedule._get_time_slots(13.0, 18.0)
+
+    def _is_even_week(self, date):
+        """Check if the given date falls in an even week number."""
+        return date.isocalendar()[1] % 2 == 0
+
+    def _get_pattern_slot_keys(self, date_from, date_to):
+        """Expand the even/odd week shift pattern into (date, time) pairs."""
+        self.ensure_one()
+        morning_slots = self._get_time_slots(True)
+        afternoon_slots = self._get_time_slots(False)
+
+        slot_keys = []
+        current_date = date_from
+        while current_date <= date_to:
+            # Skip weekends
+            if current_date.weekday() <= 4:  # Monday to Friday
+                is_even = self._is_even_week(current_date)
+                time_slots = []
+                # Morning shift
+                if (is_even and self.even_week_morning) or \
+                   (not is_even and self.odd_week_morning):
+                    time_slots += morning_slots
+                # Afternoon shift
+                if (is_even and self.even_week_afternoon) or \
+                   (not is_even and self.odd_week_afternoon):
+                    time_slots += afternoon_slots
+                slot_keys.extend(
+                    (current_date, time_slot) for time_slot in time_slots)
+            current_date += timedelta(days=1)
+        return slot_keys
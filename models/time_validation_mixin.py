@@ -1,6 +1,17 @@
 from odoo import models, _
 from odoo.exceptions import ValidationError
 
+# Working hours and slot length, in minutes since midnight
+FIRST_SLOT_MINUTE = 8 * 60
+END_MINUTE = 18 * 60
+SLOT_MINUTES = 30
+
+
+def time_to_minute(time_value):
+    """Convert a float time in 24-hour format (e.g., 13.5 for 1:30 PM)
+    into minutes since midnight (e.g., 810)."""
+    return int(round(time_value * 60))
+
 
 class TimeValidationMixin(models.AbstractModel):
     _name = 'hr.hospital.time.validation.mixin'
@@ -13,15 +24,16 @@ class TimeValidationMixin(models.AbstractModel):
         Raises:
             ValidationError: If time validation fails
         """
+        minute = time_to_minute(time_value)
+
         # Check if time is between 8 and 18
-        if time_value < 8 or time_value >= 18:
+        if minute < FIRST_SLOT_MINUTE or minute >= END_MINUTE:
             raise ValidationError(_(
                 'Appointment time must be between 8:00 and 17:59'
             ))
 
-        # Check if minutes are either .0 or .5 (30 minutes intervals)
-        minutes = time_value % 1
-        if minutes not in [0.0, 0.5]:
+        # Check if the time falls on a whole minute of a 30 minutes interval
+        if minute != time_value * 60 or minute % SLOT_MINUTES:
             raise ValidationError(_(
                 'Appointments can only be scheduled at hour or half-hour '
                 'intervals'
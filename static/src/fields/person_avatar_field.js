@@ -0,0 +1,37 @@
+/** @odoo-module **/
+
+import { Component } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+
+/**
+ * Shows the photo of a patient or physician from the image checksum alone,
+ * so list views do not read image data. The browser loads the thumbnail
+ * from /hr_hospital/image and caches it until the checksum changes.
+ */
+export class PersonAvatarField extends Component {
+    static template = "hr_hospital.PersonAvatarField";
+    static props = {
+        ...standardFieldProps,
+        size: { type: Number, optional: true },
+    };
+    static defaultProps = {
+        size: 64,
+    };
+
+    get url() {
+        const { record, name, size } = this.props;
+        return `/hr_hospital/image/${record.resModel}/${record.resId}/${size}?unique=${record.data[name]}`;
+    }
+}
+
+export const personAvatarField = {
+    component: PersonAvatarField,
+    displayName: "Person Avatar",
+    supportedTypes: ["char"],
+    extractProps: ({ options }) => ({
+        size: options.size,
+    }),
+};
+
+registry.category("fields").add("person_avatar", personAvatarField);
@@ -5,3 +5,9 @@ from . import test_physician_change_history
 from . import test_physician_schedule
 from . import test_generate_schedule_wizard
 from . import test_reschedule_appointment_wizard
+from . import test_schedule_template
+from . import test_physician_day
+from . import test_patient_visits
+from . import test_patient
+from . import test_patient_import
+from . import test_patient_duplicate
@@ -301,3 +301,101 @@ class TestGenerateScheduleWizard(common.TransactionCase):
                 0.5,
                 "Afternoon slots should be 30 minutes apart"
             )
+
+    def test_pattern_expansion(self):
+        """Test even/odd week pattern expansion into slot keys"""
+        # Start on a Monday of an even ISO week
+        test_date = date.today() + timedelta(days=1)
+        while test_date.weekday() != 0 or \
+                test_date.isocalendar()[1] % 2 != 0:
+            test_date += timedelta(days=1)
+
+        wizard = self.env['hr.hospital.generate.schedule.wizard'].create({
+            'physician_id': self.physician.id,
+            'date_from': test_date,
+            'date_to': test_date + timedelta(days=13),  # Two full weeks
+            'even_week_morning': True,
+            'even_week_afternoon': False,
+            'odd_week_morning': False,
+            'odd_week_afternoon': True,
+        })
+        slot_keys = wizard._get_pattern_slot_keys(
+            wizard.date_from, wizard.date_to)
+
+        # 10 working days with one 10-slot shift each
+        self.assertEqual(len(slot_keys), 100)
+        for slot_date, slot_time in slot_keys:
+            self.assertLessEqual(slot_date.weekday(), 4)
+            if wizard._is_even_week(slot_date):
+                self.assertLess(slot_time, 13.0)
+            else:
+                self.assertGreaterEqual(slot_time, 13.0)
+
+        # Generated slots match the expanded pattern
+        wizard.action_generate_slots()
+        slots = self.env['hr.hospital.physician.schedule'].search([
+            ('physician_id', '=', self.physician.id),
+            ('appointment_date', '>=', wizard.date_from),
+            ('appointment_date', '<=', wizard.date_to),
+        ])
+        self.assertEqual(len(slots), 100)
+
+    def test_rollout_many_physicians(self):
+        """Test roll-out job creation and background processing"""
+        test_date = date.today() + timedelta(days=30)
+        while test_date.weekday() > 4:
+            test_date += timedelta(days=1)
+
+        other_physician = self._create_physician({
+            'name_first': 'Dr. Jane',
+            'name_last': 'Doe',
+        })
+        intern = self._create_physician({
+            'name_first': 'Dr. Intern',
+            'name_last': 'Junior',
+            'is_intern': True,
+            'mentor_id': self.physician.id,
+        })
+
+        wizard = self.env['hr.hospital.generate.schedule.wizard'].create({
+            'mode': 'rollout',
+            'physician_ids': [
+                (6, 0, [self.physician.id, other_physician.id, intern.id])],
+            'date_from': test_date,
+            'date_to': test_date,
+            'even_week_morning': True,
+            'even_week_afternoon': True,
+            'odd_week_morning': True,
+            'odd_week_afternoon': True,
+        })
+        action = wizard.action_start_rollout()
+        rollout = self.env['hr.hospital.schedule.rollout'].browse(
+            action['res_id'])
+
+        # Interns are left out of the roll-out
+        self.assertEqual(
+            rollout.line_ids.physician_id,
+            self.physician | other_physician)
+        self.assertEqual(rollout.state, 'queued')
+
+        rollout._cron_process_rollouts()
+
+        self.assertEqual(rollout.state, 'done')
+        self.assertEqual(rollout.progress, 100.0)
+        self.assertEqual(rollout.slots_created, 40)
+        for physician in (self.physician, other_physician):
+            slots = self.env['hr.hospital.physician.schedule'].search([
+                ('physician_id', '=', physician.id),
+                ('appointment_date', '=', test_date),
+            ])
+            self.assertEqual(len(slots), 20)
+
+    def test_rollout_requires_physicians(self):
+        """Test that a roll-out without physicians is rejected"""
+        wizard = self.env['hr.hospital.generate.schedule.wizard'].create({
+            'mode': 'rollout',
+            'date_from': date.today(),
+            'date_to': date.today(),
+        })
+        with self.assertRaises(ValidationError):
+            wizard.action_start_rollout()
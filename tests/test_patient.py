@@ -0,0 +1,155 @@
+from datetime import date
+
+from odoo.tests import TransactionCase
+
+
+class TestPatient(TransactionCase):
+
+    def _create_patient(self, values):
+        """Helper method to create a patient with required fields."""
+        default_values = {
+            'name_first': 'Test',
+            'name_last': 'Patient',
+            'gender': 'female',
+        }
+        return self.env['hr.hospital.patient'].create(
+            {**default_values, **values})
+
+    def test_refresh_age_on_birthday(self):
+        """Test that only patients with a birthday get their age updated"""
+        Patient = self.env['hr.hospital.patient']
+        birthday = self._create_patient({'date_of_birth': date(1990, 3, 10)})
+        other = self._create_patient({'date_of_birth': date(1990, 6, 1)})
+        # Stored ages as they were on the day before the birthday
+        self.env.cr.execute("""
+            UPDATE hr_hospital_patient SET age = 35 WHERE id IN %s
+        """, ((birthday.id, other.id),))
+        Patient.invalidate_model(['age'])
+        self.env['ir.config_parameter'].sudo().set_param(
+            'hr_hospital.age_refreshed_until', '2026-03-09')
+
+        self.assertEqual(Patient._cron_refresh_age(date(2026, 3, 10)), 1)
+        self.assertEqual(birthday.age, 36)
+        self.assertEqual(other.age, 35)
+        # Running again the same day has nothing left to do
+        self.assertEqual(Patient._cron_refresh_age(date(2026, 3, 10)), 0)
+
+    def test_refresh_age_without_watermark(self):
+        """Test that the first run refreshes every stale age"""
+        Patient = self.env['hr.hospital.patient']
+        patients = self._create_patient({'date_of_birth': date(1990, 3, 10)}) \
+            | self._create_patient({'date_of_birth': date(1990, 6, 1)})
+        self.env.cr.execute("""
+            UPDATE hr_hospital_patient SET age = 0 WHERE id IN %s
+        """, (tuple(patients.ids),))
+        Patient.invalidate_model(['age'])
+        params = self.env['ir.config_parameter'].sudo()
+        params.set_param('hr_hospital.age_refreshed_until', False)
+
+        self.assertGreaterEqual(
+            Patient._cron_refresh_age(date(2026, 3, 10)), 2)
+        self.assertEqual(patients.mapped('age'), [36, 35])
+        self.assertEqual(
+            params.get_param('hr_hospital.age_refreshed_until'), '2026-03-10')
+
+    def test_birthdays_since_leap_day(self):
+        """Test that February 29 birthdays are covered in non-leap years"""
+        Patient = self.env['hr.hospital.patient']
+        self.assertEqual(
+            Patient._get_birthdays_since(date(2027, 2, 27), date(2027, 2, 28)),
+            {228, 229})
+        self.assertEqual(
+            Patient._get_birthdays_since(date(2028, 2, 27), date(2028, 2, 28)),
+            {228})
+
+    def test_bulk_import(self):
+        """Test that bulk imports create records without chatter messages"""
+        Patient = self.env['hr.hospital.patient']
+        result = Patient.bulk_import([{
+            'name_first': 'Bulk',
+            'name_last': 'Patient %s' % index,
+            'gender': 'male',
+        } for index in range(5)], chunk_size=2)
+
+        self.assertEqual(result['count'], 5)
+        patients = Patient.browse(result['ids'])
+        self.assertEqual(len(patients.exists()), 5)
+        self.assertFalse(self.env['mail.message'].search_count([
+            ('model', '=', 'hr.hospital.patient'),
+            ('res_id', 'in', patients.ids),
+        ]))
+        self.assertFalse(patients.message_follower_ids)
+
+    def test_name_search(self):
+        """Test that people are found by name words and phone digits"""
+        Patient = self.env['hr.hospital.patient']
+        jane = self._create_patient({
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'phone': '+1 (555) 123-4567',
+        })
+        self._create_patient({'name_first': 'John', 'name_last': 'Doe'})
+
+        self.assertEqual(jane.phone_normalized, '15551234567')
+        self.assertEqual(Patient.name_search('doe jan'), [
+            (jane.id, jane.display_name)])
+        self.assertEqual(
+            [res_id for res_id, _name in Patient.name_search('+1 555 12')],
+            [jane.id])
+        self.assertEqual(Patient.find_by_phone('1 555 123 4567'), jane)
+
+    def test_image_checksum(self):
+        """Test that the photo checksum matches its attachment"""
+        patient = self._create_patient({
+            'image_1920': 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlE'
+                          'QVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==',
+        })
+        attachment = self.env['ir.attachment'].search([
+            ('res_model', '=', 'hr.hospital.patient'),
+            ('res_id', '=', patient.id),
+            ('res_field', '=', 'image_1920'),
+        ])
+        self.assertTrue(patient.image_checksum)
+        self.assertEqual(patient.image_checksum, attachment.checksum)
+
+        patient.image_1920 = False
+        self.assertFalse(patient.image_checksum)
+
+    def test_timeline_pages(self):
+        """Test that the timeline pages through every source in order"""
+        physician = self.env['hr.hospital.physician'].create({
+            'name_first': 'John',
+            'name_last': 'Smith',
+            'gender': 'male',
+        })
+        category = self.env['hr.hospital.disease.category'].create({
+            'name': 'Timeline Category',
+        })
+        disease = self.env['hr.hospital.disease'].create({
+            'name': 'Timeline Disease',
+            'category_id': category.id,
+        })
+        patient = self._create_patient({'personal_physician': physician.id})
+        diagnoses = self.env['hr.hospital.diagnosis'].create([{
+            'date_of_diagnosis': diagnosis_date,
+            'physician': physician.id,
+            'patient_id': patient.id,
+            'disease_id': disease.id,
+            'treatment_recommendations': 'Rest',
+        } for diagnosis_date in (date(2010, 1, 1), date(2020, 1, 1))])
+
+        change = self.env['hr.hospital.physician.change.history'].search([
+            ('patient_id', '=', patient.id)])
+
+        page = patient.get_timeline(limit=2)
+        self.assertEqual(
+            [(event['type'], event['id']) for event in page['events']],
+            [('physician_change', change.id), ('diagnosis', diagnoses[1].id)])
+        self.assertEqual(page['events'][1]['disease'], 'Timeline Disease')
+        self.assertTrue(page['next_cursor'])
+
+        page = patient.get_timeline(limit=2, cursor=page['next_cursor'])
+        self.assertEqual(
+            [(event['type'], event['id']) for event in page['events']],
+            [('diagnosis', diagnoses[0].id)])
+        self.assertFalse(page['next_cursor'])
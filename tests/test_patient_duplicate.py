@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+
+from odoo.tests import TransactionCase
+
+
+class TestPatientDuplicate(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.Patient = self.env['hr.hospital.patient']
+        self.Duplicate = self.env['hr.hospital.patient.duplicate']
+        # Start the incremental scan from scratch
+        self.env['ir.config_parameter'].sudo().set_param(
+            'hr_hospital.duplicate_scan_cursor', False)
+
+        self.patient = self.Patient.create({
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'gender': 'female',
+            'date_of_birth': date(1990, 1, 1),
+            'phone': '+1 (555) 123-4567',
+        })
+        self.duplicate = self.Patient.create({
+            'name_first': 'Jane',
+            'name_last': 'Doé',
+            'gender': 'female',
+            'date_of_birth': date(1990, 1, 1),
+            'phone': '15551234567',
+            'email': 'jane@example.com',
+        })
+        self.other = self.Patient.create({
+            'name_first': 'Janet',
+            'name_last': 'Dodd',
+            'gender': 'female',
+            'date_of_birth': date(1990, 1, 1),
+            'passport_details': 'AB123',
+        })
+
+    def test_detect_duplicates(self):
+        """Test that only similar patients are stored as candidates"""
+        self.Duplicate._cron_detect_duplicates()
+        pairs = self.Duplicate.search([
+            ('patient_id', 'in', (self.patient | self.duplicate).ids)])
+        pair = pairs.filtered(lambda p: p.duplicate_id == self.duplicate)
+        self.assertEqual(len(pair), 1)
+        self.assertEqual(pair.patient_id, self.patient)
+        self.assertIn('phone', pair.reasons)
+
+        # Nothing changed since the last run, nothing is rescanned
+        self.assertEqual(self.Duplicate._cron_detect_duplicates(), 0)
+
+    def test_merge_duplicates(self):
+        """Test that merging re-points visits and archives the duplicate"""
+        physician = self.env['hr.hospital.physician'].create({
+            'name_first': 'John',
+            'name_last': 'Smith',
+            'gender': 'male',
+        })
+        visit_date = date.today() + timedelta(days=1)
+        while visit_date.weekday() > 4:
+            visit_date += timedelta(days=1)
+        self.env['hr.hospital.physician.schedule'].generate_slots(
+            physician.id, visit_date)
+        visit = self.env['hr.hospital.patient.visits'].create({
+            'physician_id': physician.id,
+            'patient_id': self.duplicate.id,
+            'appointment_date': visit_date,
+            'appointment_time': 10.0,
+            'state': 'scheduled',
+        })
+
+        self.Duplicate._cron_detect_duplicates()
+        pair = self.Duplicate.search([
+            ('patient_id', '=', self.patient.id),
+            ('duplicate_id', '=', self.duplicate.id),
+        ])
+        pair.action_merge()
+
+        self.assertEqual(pair.state, 'merged')
+        self.assertEqual(visit.patient_id, self.patient)
+        self.assertFalse(self.duplicate.active)
+        self.assertEqual(self.patient.email, 'jane@example.com')
+        self.assertEqual(self.patient.next_appointment_date, visit_date)
@@ -0,0 +1,98 @@
+import base64
+import json
+
+from odoo.tests import TransactionCase
+from odoo.tools import mute_logger
+
+
+class TestPatientImport(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.Patient = self.env['hr.hospital.patient']
+        self.existing = self.Patient.create({
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'gender': 'female',
+            'date_of_birth': '1990-01-01',
+        })
+
+    def _create_import(self, content, file_format='csv', chunk_size=2):
+        return self.env['hr.hospital.patient.import'].create({
+            'name': 'Test import',
+            'import_file': base64.b64encode(content.encode()),
+            'file_format': file_format,
+            'chunk_size': chunk_size,
+        })
+
+    def test_csv_import(self):
+        """Test that rows are created, matched and validated in chunks"""
+        job = self._create_import(
+            'name_first,name_last,gender,date_of_birth,passport_details\n'
+            'jane,doe,,1990-01-01,AB123\n'
+            'John,Smith,male,1985-05-15,CD456\n'
+            'Broken,Row,robot,,\n'
+            'Johnny,Smith,male,1985-05-15,CD456\n'
+            'No,Gender,,,\n')
+        job.action_start()
+        self.env['hr.hospital.patient.import']._cron_process_imports()
+
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.rows_processed, 5)
+        self.assertEqual(job.created_count, 1)
+        self.assertEqual(job.updated_count, 2)
+        self.assertEqual(job.error_count, 2)
+        self.assertIn('Row 3', job.error_log)
+        self.assertIn('Row 5', job.error_log)
+        # Matched by name and date of birth
+        self.assertEqual(self.existing.passport_details, 'AB123')
+        self.assertEqual(self.existing.gender, 'female')
+        # Matched by passport across chunks
+        smith = self.Patient.search([('passport_details', '=', 'CD456')])
+        self.assertEqual(len(smith), 1)
+        self.assertEqual(smith.name_first, 'Johnny')
+
+    def test_jsonl_import_resumes(self):
+        """Test that an import resumes after its committed rows"""
+        lines = [
+            {'name_first': 'Ann', 'name_last': 'Lee', 'gender': 'female'},
+            {'name_first': 'Bob', 'name_last': 'Lee', 'gender': 'male'},
+            {'name_first': 'Cid', 'name_last': 'Lee', 'gender': 'male'},
+        ]
+        job = self._create_import(
+            '\n'.join(json.dumps(line) for line in lines),
+            file_format='jsonl', chunk_size=1)
+        job.state = 'queued'
+
+        self.assertEqual(job._process(max_chunks=2, auto_commit=False), 2)
+        self.assertEqual(job.rows_processed, 2)
+        self.assertEqual(job.state, 'queued')
+
+        job._process(max_chunks=2, auto_commit=False)
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.created_count, 3)
+        self.assertEqual(
+            self.Patient.search_count([('name_last', '=', 'Lee')]), 3)
+
+    @mute_logger('odoo.sql_db')
+    def test_failing_row_is_skipped(self):
+        """Test that a row rejected by the database does not block the rest"""
+        self.env.cr.execute("""
+            ALTER TABLE hr_hospital_patient
+            ADD CONSTRAINT test_no_broken_patient CHECK (name_last != 'Broken')
+        """)
+        job = self._create_import(
+            'name_first,name_last,gender\n'
+            'Ann,Lee,female\n'
+            'Bob,Broken,male\n'
+            'Cid,Lee,male\n', chunk_size=3)
+        job.state = 'queued'
+        job._process(max_chunks=5, auto_commit=False)
+
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.rows_processed, 3)
+        self.assertEqual(job.created_count, 2)
+        self.assertEqual(job.error_count, 1)
+        self.assertIn('Row 2', job.error_log)
+        self.assertEqual(
+            self.Patient.search_count([('name_last', '=', 'Lee')]), 2)
@@ -0,0 +1,353 @@
+from datetime import date, datetime, timedelta
+from odoo.tests import common
+from odoo.exceptions import ValidationError
+
+
+class TestPatientVisits(common.TransactionCase):
+    def _create_person(self, model, values):
+        """Helper method to create a person (patient or physician) with required fields."""
+        default_values = {
+            'name_first': 'Test',
+            'name_last': 'Person',
+            'gender': 'male',
+            'phone': '1234567890',
+            'email': 'test@example.com'
+        }
+        return self.env[model].create({**default_values, **values})
+
+    def setUp(self):
+        super().setUp()
+        self.physician = self._create_person('hr.hospital.physician', {
+            'name_first': 'Dr. John',
+            'name_last': 'Smith',
+            'is_intern': False,
+        })
+        self.patient = self._create_person('hr.hospital.patient', {
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'date_of_birth': date(1990, 1, 1),
+        })
+        self.patient2 = self._create_person('hr.hospital.patient', {
+            'name_first': 'John',
+            'name_last': 'Smith',
+            'date_of_birth': date(1985, 5, 15),
+        })
+
+        # Get next weekday for testing
+        self.test_date = date.today() + timedelta(days=1)
+        while self.test_date.weekday() > 4:  # Skip weekends
+            self.test_date += timedelta(days=1)
+        self.env['hr.hospital.physician.schedule'].generate_slots(
+            self.physician.id, self.test_date)
+        self.Visits = self.env['hr.hospital.patient.visits']
+
+    def test_book_slot(self):
+        """Test booking a free slot"""
+        result = self.Visits.book_slot(
+            self.physician.id, self.patient.id, self.test_date, 9.0)
+
+        self.assertEqual(result['status'], 'booked')
+        self.assertFalse(result['fallback_used'])
+        visit = self.Visits.browse(result['visit_id'])
+        self.assertEqual(visit.state, 'scheduled')
+        self.assertEqual(visit.appointment_time, 9.0)
+
+    def test_book_taken_slot(self):
+        """Test that a taken slot is reported, not raised"""
+        self.Visits.book_slot(
+            self.physician.id, self.patient.id, self.test_date, 9.0)
+        result = self.Visits.book_slot(
+            self.physician.id, self.patient2.id, self.test_date, 9.0)
+
+        self.assertEqual(result['status'], 'unavailable')
+        self.assertFalse(result['visit_id'])
+
+    def test_book_slot_with_fallback(self):
+        """Test falling back to the next free slot of the physician"""
+        self.Visits.book_slot(
+            self.physician.id, self.patient.id, self.test_date, 9.0)
+        result = self.Visits.book_slot(
+            self.physician.id, self.patient2.id, self.test_date, 9.0,
+            fallback=True)
+
+        self.assertEqual(result['status'], 'booked')
+        self.assertTrue(result['fallback_used'])
+        self.assertEqual(result['appointment_time'], 9.5)
+
+    def test_book_slot_lost_race(self):
+        """Test that a slot taken behind a stale availability is skipped"""
+        self.Visits.book_slot(
+            self.physician.id, self.patient.id, self.test_date, 9.0)
+        # A concurrent booking committed after the availability was read
+        self.env.cr.execute("""
+            UPDATE hr_hospital_physician_schedule SET is_available = TRUE
+            WHERE physician_id = %s AND appointment_date = %s
+        """, (self.physician.id, self.test_date))
+        result = self.Visits.book_slot(
+            self.physician.id, self.patient2.id, self.test_date, 9.0,
+            fallback=True)
+
+        self.assertEqual(result['status'], 'booked')
+        self.assertTrue(result['fallback_used'])
+        self.assertEqual(result['appointment_time'], 9.5)
+
+    def test_book_slot_invalid(self):
+        """Test that validation errors are returned in the result"""
+        self.Visits.book_slot(
+            self.physician.id, self.patient.id, self.test_date, 9.0)
+        # Same patient twice on the same day
+        result = self.Visits.book_slot(
+            self.physician.id, self.patient.id, self.test_date, 10.0)
+
+        self.assertEqual(result['status'], 'invalid')
+        self.assertIn('already has an appointment', result['message'])
+
+    def test_batch_create(self):
+        """Test creating many visits in one batch"""
+        patients = self.env['hr.hospital.patient'].create([{
+            'name_first': 'Patient',
+            'name_last': str(index),
+            'gender': 'female',
+        } for index in range(5)])
+        visits = self.Visits.create([{
+            'physician_id': self.physician.id,
+            'patient_id': patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 8.0 + index / 2,
+        } for index, patient in enumerate(patients)])
+
+        self.assertEqual(len(visits), 5)
+        self.assertTrue(all(visit.schedule_id for visit in visits))
+
+    def test_batch_create_reports_every_row(self):
+        """Test that one error lists every offending row of the batch"""
+        self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 9.0,
+        })
+        patient3 = self._create_person('hr.hospital.patient', {
+            'name_first': 'Third',
+            'name_last': 'Patient',
+        })
+
+        with self.assertRaises(ValidationError) as error:
+            self.Visits.create([{
+                # Valid row
+                'physician_id': self.physician.id,
+                'patient_id': self.patient2.id,
+                'appointment_date': self.test_date,
+                'appointment_time': 10.0,
+            }, {
+                # Slot booked in the database
+                'physician_id': self.physician.id,
+                'patient_id': patient3.id,
+                'appointment_date': self.test_date,
+                'appointment_time': 9.0,
+            }, {
+                # Collides with the first row of the batch
+                'physician_id': self.physician.id,
+                'patient_id': patient3.id,
+                'appointment_date': self.test_date,
+                'appointment_time': 10.0,
+            }, {
+                # Second visit of the patient on the same day
+                'physician_id': self.physician.id,
+                'patient_id': self.patient.id,
+                'appointment_date': self.test_date,
+                'appointment_time': 11.0,
+            }])
+
+        message = str(error.exception)
+        self.assertNotIn('Line 1:', message)
+        self.assertIn('Line 2:', message)
+        self.assertIn('Line 3:', message)
+        self.assertIn('Line 4:', message)
+
+    def test_cancelled_visit_frees_slot(self):
+        """Test that a cancelled visit no longer blocks its slot"""
+        visit = self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 9.0,
+        })
+        visit.action_cancel()
+
+        new_visit = self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient2.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 9.0,
+        })
+        self.assertTrue(new_visit.exists())
+
+    def test_active_booking_enforced_on_write(self):
+        """Test that moving a visit onto a booked slot is rejected"""
+        self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 9.0,
+        })
+        visit = self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient2.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 10.0,
+        })
+        with self.assertRaises(ValidationError):
+            visit.write({'appointment_time': 9.0})
+
+    def test_slot_linked_after_booking(self):
+        """Test that a regenerated slot is linked to its booked visit"""
+        Schedule = self.env['hr.hospital.physician.schedule']
+        next_day = self.test_date + timedelta(days=1)
+        while next_day.weekday() > 4:  # Skip weekends
+            next_day += timedelta(days=1)
+        Schedule.generate_slots(self.physician.id, next_day)
+        visit = self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': next_day,
+            'appointment_time': 10.0,
+        })
+        visit.schedule_id.unlink()
+        visit.invalidate_recordset(['schedule_id'])
+        self.assertFalse(visit.schedule_id)
+
+        Schedule.generate_slots(self.physician.id, next_day)
+        self.assertTrue(visit.schedule_id)
+        self.assertEqual(visit.schedule_id.appointment_time, 10.0)
+        self.assertFalse(visit.schedule_id.is_available)
+
+    def test_multi_record_transitions(self):
+        """Test that state transitions apply to a whole recordset"""
+        visits = self.Visits.create([{
+            'physician_id': self.physician.id,
+            'patient_id': patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': appointment_time,
+        } for patient, appointment_time in [
+            (self.patient, 9.0), (self.patient2, 9.5)]])
+
+        visits.action_schedule()
+        self.assertEqual(set(visits.mapped('state')), {'scheduled'})
+        visits.action_start()
+        self.assertEqual(set(visits.mapped('state')), {'in_progress'})
+
+        # Visits without diagnosis block the whole batch
+        with self.assertRaises(ValidationError) as error:
+            visits.action_complete()
+        self.assertIn('John Smith', str(error.exception))
+        self.assertEqual(set(visits.mapped('state')), {'in_progress'})
+
+        visits.action_cancel()
+        self.assertEqual(set(visits.mapped('state')), {'cancelled'})
+        self.assertTrue(all(visits.schedule_id.mapped('is_available')))
+        with self.assertRaises(ValidationError):
+            visits.action_start()
+
+    def test_sweep_no_shows(self):
+        """Test that past scheduled visits are swept as no-shows"""
+        visits = self.Visits.create([{
+            'physician_id': self.physician.id,
+            'patient_id': patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': appointment_time,
+            'state': 'scheduled',
+        } for patient, appointment_time in [
+            (self.patient, 9.0), (self.patient2, 16.0)]])
+        self.assertEqual(self.patient.next_appointment_date, self.test_date)
+
+        swept = self.Visits.with_context(tz='UTC')._cron_sweep_no_shows(
+            now=datetime.combine(self.test_date, datetime.min.time())
+            + timedelta(hours=12))
+        self.assertEqual(swept, 1)
+        self.assertEqual(visits.mapped('state'), ['no_show', 'scheduled'])
+        self.assertFalse(self.patient.next_appointment_date)
+        self.assertEqual(self.patient2.next_appointment_date, self.test_date)
+
+        self.env['ir.config_parameter'].sudo().set_param(
+            'hr_hospital.no_show_action', 'cancel')
+        self.Visits.with_context(tz='UTC')._cron_sweep_no_shows(
+            now=datetime.combine(self.test_date + timedelta(days=1),
+                                 datetime.min.time()))
+        self.assertEqual(visits[1].state, 'cancelled')
+        self.assertTrue(visits[1].schedule_id.is_available)
+
+    def test_rebook_after_no_show(self):
+        """Test that a no-show frees the slot and the patient's day"""
+        visit = self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 9.0,
+            'state': 'scheduled',
+        })
+        self.Visits.with_context(tz='UTC')._cron_sweep_no_shows(
+            now=datetime.combine(self.test_date, datetime.min.time())
+            + timedelta(hours=12))
+        self.assertEqual(visit.state, 'no_show')
+        self.assertTrue(visit.schedule_id.is_available)
+        self.assertFalse(
+            self.physician._is_slot_booked(self.test_date, 9.0))
+
+        rebooked = self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 9.0,
+            'state': 'scheduled',
+        })
+        self.assertEqual(rebooked.schedule_id, visit.schedule_id)
+        self.assertFalse(rebooked.schedule_id.is_available)
+
+    def test_sweep_uses_local_time(self):
+        """Test that the sweep cutoff follows the user's timezone"""
+        visit = self.Visits.create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 9.0,
+            'state': 'scheduled',
+        })
+        # 12:00 UTC is 07:00 in New York (06:00 in winter)
+        noon_utc = datetime.combine(self.test_date, datetime.min.time()) \
+            + timedelta(hours=12)
+        self.Visits.with_context(
+            tz='America/New_York')._cron_sweep_no_shows(now=noon_utc)
+        self.assertEqual(visit.state, 'scheduled')
+
+        self.Visits.with_context(tz='Europe/Moscow')._cron_sweep_no_shows(
+            now=noon_utc)
+        self.assertEqual(visit.state, 'no_show')
+
+    def test_next_appointment(self):
+        """Test that the next appointment is the earliest scheduled visit"""
+        visits = self.Visits.create([{
+            'physician_id': self.physician.id,
+            'patient_id': patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': appointment_time,
+            'state': 'scheduled',
+        } for patient, appointment_time in [
+            (self.patient, 11.0), (self.patient2, 9.0)]])
+        self.assertEqual(self.patient.next_appointment_time, 11.0)
+        self.assertEqual(self.patient2.next_appointment_time, 9.0)
+
+        visits[0].action_cancel()
+        self.assertFalse(self.patient.next_appointment_date)
+
+        # Values left in the past are fixed by the nightly refresh
+        self.env.cr.execute("""
+            UPDATE hr_hospital_patient
+            SET next_appointment_date = %s
+            WHERE id = %s
+        """, (date.today() - timedelta(days=1), self.patient2.id))
+        self.patient2.invalidate_recordset()
+        self.assertEqual(
+            self.env['hr.hospital.patient']._cron_refresh_next_appointment(),
+            1)
+        self.assertEqual(self.patient2.next_appointment_date, self.test_date)
@@ -1,4 +1,5 @@
 from datetime import date, timedelta
+from odoo import fields
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import ValidationError
 
@@ -266,3 +267,83 @@ class TestPhysician(TransactionCase):
         """Test that interns cannot generate schedules."""
         with self.assertRaises(ValidationError):
             self.intern.generate_schedule_slots()
+
+    def test_schedule_horizon_cron(self):
+        """Test rolling-horizon materialization with watermark."""
+        self.env['ir.config_parameter'].sudo().set_param(
+            'hr_hospital.schedule_horizon_weeks', 1)
+        horizon_end = date.today() + timedelta(weeks=1)
+
+        self.env['hr.hospital.physician']._cron_materialize_schedule_horizon()
+
+        self.assertEqual(
+            self.physician.schedule_materialized_until, horizon_end)
+        self.assertFalse(self.intern.schedule_materialized_until)
+        weekdays = sum(
+            1 for offset in range(8)
+            if (date.today() + timedelta(days=offset)).weekday() <= 4)
+        slots = self.Schedule.search([
+            ('physician_id', '=', self.physician.id),
+            ('appointment_date', '>=', date.today()),
+            ('appointment_date', '<=', horizon_end),
+        ])
+        self.assertEqual(len(slots), weekdays * 20)
+
+        # A second run within the same day has nothing left to generate
+        self.assertEqual(
+            self.env[
+                'hr.hospital.physician']._cron_materialize_schedule_horizon(),
+            0)
+
+    def test_deferred_schedule_generation(self):
+        """Test that bulk-created physicians get slots from a batch job."""
+        physicians = self.env['hr.hospital.physician'].with_context(
+            defer_schedule_generation=True,
+        ).create([{
+            'name_first': 'Imported',
+            'name_last': 'Doctor %s' % index,
+            'gender': 'female',
+        } for index in range(3)])
+
+        self.assertFalse(self.Schedule.search([
+            ('physician_id', 'in', physicians.ids),
+        ]))
+
+        today = fields.Date.context_today(physicians)
+        rollout = self.env['hr.hospital.schedule.rollout'].search([
+            ('line_ids.physician_id', 'in', physicians.ids),
+        ])
+        if today.weekday() > 4:
+            self.assertFalse(rollout, "Nothing is queued on weekends")
+            return
+
+        self.assertEqual(rollout.line_ids.physician_id, physicians)
+        rollout._cron_process_rollouts()
+        for physician in physicians:
+            slots = self.Schedule.search([
+                ('physician_id', '=', physician.id),
+                ('appointment_date', '=', today),
+            ])
+            self.assertEqual(len(slots), 20)
+
+    def test_queued_generation_keeps_target_date(self):
+        """Test that a queued roll-out generates its own date, not today."""
+        target_date = date.today() + timedelta(days=7)
+        while target_date.weekday() > 4:
+            target_date += timedelta(days=1)
+        physician = self.env['hr.hospital.physician'].with_context(
+            defer_schedule_generation=True,
+        ).create({
+            'name_first': 'Queued',
+            'name_last': 'Doctor',
+            'gender': 'male',
+        })
+        rollout = physician._queue_schedule_generation(target_date)
+        self.assertEqual(rollout.date_from, target_date)
+
+        rollout._cron_process_rollouts()
+        slots = self.Schedule.search([
+            ('physician_id', '=', physician.id),
+            ('appointment_date', '=', target_date),
+        ])
+        self.assertEqual(len(slots), 20)
@@ -350,3 +350,22 @@ class TestPhysicianChangeHistory(TransactionCase):
                 patient_2_history[i].date_established,
                 patient_2_history[i + 1].date_established
             )
+
+    def test_multi_record_physician_change(self):
+        """Test that a multi-record write only logs actual changes"""
+        patients = self.env['hr.hospital.patient'].create([{
+            'name_first': 'Test',
+            'name_last': 'Patient %s' % index,
+            'gender': 'male',
+            'personal_physician': physician.id,
+        } for index, physician in enumerate(
+            [self.physician_1, self.physician_2, self.physician_2])])
+        History = self.env['hr.hospital.physician.change.history']
+        self.assertEqual(
+            History.search_count([('patient_id', 'in', patients.ids)]), 3)
+
+        patients.write({'personal_physician': self.physician_2.id})
+        history = History.search([('patient_id', 'in', patients.ids)])
+        self.assertEqual(len(history), 4)
+        self.assertEqual(
+            len(history.filtered(lambda h: h.patient_id == patients[0])), 2)
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+from odoo.tests import common
+
+
+class TestPhysicianDay(common.TransactionCase):
+    def _create_person(self, model, values):
+        """Helper method to create a person (patient or physician) with required fields."""
+        default_values = {
+            'name_first': 'Test',
+            'name_last': 'Person',
+            'gender': 'male',
+            'phone': '1234567890',
+            'email': 'test@example.com'
+        }
+        return self.env[model].create({**default_values, **values})
+
+    def setUp(self):
+        super().setUp()
+        self.physician = self._create_person('hr.hospital.physician', {
+            'name_first': 'Dr. John',
+            'name_last': 'Smith',
+            'is_intern': False,
+        })
+        self.patient = self._create_person('hr.hospital.patient', {
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'date_of_birth': date(1990, 1, 1),
+        })
+        self.test_date = date.today() + timedelta(days=1)
+        while self.test_date.weekday() > 4:  # Skip weekends
+            self.test_date += timedelta(days=1)
+        self.env['hr.hospital.physician.schedule'].generate_slots(
+            self.physician.id, self.test_date)
+        self.PhysicianDay = self.env['hr.hospital.physician.day']
+
+    def test_slot_mask_follows_schedule(self):
+        """Test that generated slots set all 20 bits of the day"""
+        slot_mask, booked_mask = self.PhysicianDay._get_masks(
+            self.physician, self.test_date)
+        self.assertEqual(slot_mask, (1 << 20) - 1)
+        self.assertEqual(booked_mask, 0)
+
+        self.env['hr.hospital.physician.schedule'].search([
+            ('physician_id', '=', self.physician.id),
+            ('appointment_date', '=', self.test_date),
+            ('appointment_time', '=', 8.0),
+        ]).unlink()
+        slot_mask, _booked_mask = self.PhysicianDay._get_masks(
+            self.physician, self.test_date)
+        self.assertFalse(slot_mask & 1)
+
+    def _get_day_row(self):
+        return self.PhysicianDay.search([
+            ('physician_id', '=', self.physician.id),
+            ('day', '=', self.test_date),
+        ])
+
+    def test_slot_mask_row_follows_schedule(self):
+        """Test that slot changes set and clear bits of the stored row"""
+        day_row = self._get_day_row()
+        self.assertEqual(len(day_row), 1)
+        self.assertEqual(day_row.slot_mask, (1 << 20) - 1)
+
+        self.env['hr.hospital.physician.schedule'].search([
+            ('physician_id', '=', self.physician.id),
+            ('appointment_date', '=', self.test_date),
+            ('appointment_time', '=', 8.0),
+        ]).unlink()
+        self.assertEqual(day_row.slot_mask, ((1 << 20) - 1) & ~1)
+
+    def test_booked_mask_row_follows_visits(self):
+        """Test that visit create, move and cancel update the stored row"""
+        visit = self.env['hr.hospital.patient.visits'].create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': self.test_date,
+            'appointment_time': 9.5,
+        })
+        day_row = self._get_day_row()
+        self.assertEqual(day_row.booked_mask, 1 << 3)
+        self.assertTrue(
+            self.physician._is_slot_booked(self.test_date, 9.5))
+        self.assertEqual(
+            len(self.physician._get_free_slot_times(self.test_date)), 19)
+
+        visit.write({'appointment_time': 11.0})
+        self.assertEqual(day_row.booked_mask, 1 << 6)
+        self.assertFalse(
+            self.physician._is_slot_booked(self.test_date, 9.5))
+
+        visit.action_cancel()
+        self.assertEqual(day_row.booked_mask, 0)
+        self.assertEqual(
+            len(self.physician._get_free_slot_times(self.test_date)), 20)
+
+    def test_slot_bit_outside_grid(self):
+        """Test that times outside the slot grid map to no bit"""
+        self.assertEqual(self.PhysicianDay._slot_bit(8.0), 1)
+        self.assertEqual(self.PhysicianDay._slot_bit(17.5), 1 << 19)
+        self.assertEqual(self.PhysicianDay._slot_bit(7.5), 0)
+        self.assertEqual(self.PhysicianDay._slot_bit(18.0), 0)
+        self.assertEqual(self.PhysicianDay._slot_bit(9.25), 0)
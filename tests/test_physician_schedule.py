@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 from psycopg2.errors import UniqueViolation
 
 from odoo.tests import TransactionCase
@@ -177,3 +177,162 @@ class TestPhysicianSchedule(TransactionCase):
             len(next_week_slots), 100,
             'Should generate 100 slots for next week (20 slots * 5 days)'
         )
+
+    def test_generate_slots_returns_created_count(self):
+        """Test that slot generation only creates missing slots"""
+        tomorrow = fields.Date.today() + timedelta(days=1)
+        while tomorrow.weekday() > 4:  # If it's weekend
+            tomorrow += timedelta(days=1)
+
+        schedule = self.env['hr.hospital.physician.schedule']
+        schedule.create({
+            'physician_id': self.physician.id,
+            'appointment_date': tomorrow,
+            'appointment_time': 10.0
+        })
+
+        created = schedule.generate_slots(self.physician.id, tomorrow)
+        self.assertEqual(
+            created, 19,
+            'Only the 19 missing slots should be created'
+        )
+
+        # Running again is a no-op
+        self.assertEqual(
+            schedule.generate_slots(self.physician.id, tomorrow), 0,
+            'No slots should be created when the day is complete'
+        )
+
+    def test_find_next_available_slots(self):
+        """Test next-available-slot search across physicians"""
+        tomorrow = fields.Date.today() + timedelta(days=1)
+        while tomorrow.weekday() > 4:  # If it's weekend
+            tomorrow += timedelta(days=1)
+        start = datetime.combine(tomorrow, datetime.min.time())
+
+        cardiologist = self._create_physician({
+            'name_first': 'Jane',
+            'name_last': 'Heart',
+            'specialty': 'Cardiology',
+        })
+        schedule = self.env['hr.hospital.physician.schedule']
+        schedule.generate_slots(self.physician.id, tomorrow)
+        schedule.generate_slots(cardiologist.id, tomorrow)
+
+        patient = self.env['hr.hospital.patient'].create({
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'gender': 'female',
+        })
+        self.env['hr.hospital.patient.visits'].create({
+            'physician_id': cardiologist.id,
+            'patient_id': patient.id,
+            'appointment_date': tomorrow,
+            'appointment_time': 8.0,
+        })
+
+        slots = schedule.find_next_available_slots(
+            start=start, limit=3, specialty='Cardiology')
+        self.assertEqual(
+            [slot['appointment_time'] for slot in slots], [8.5, 9.0, 9.5])
+        self.assertTrue(
+            all(slot['physician_id'] == cardiologist.id for slot in slots))
+
+        slots = schedule.find_next_available_slots(
+            start=start, limit=1, physician_ids=[self.physician.id],
+            window='afternoon')
+        self.assertEqual(len(slots), 1)
+        self.assertEqual(slots[0]['appointment_time'], 13.0)
+        self.assertEqual(
+            slots[0]['appointment_date'], fields.Date.to_string(tomorrow))
+
+        with self.assertRaises(ValidationError):
+            schedule.find_next_available_slots(window='evening')
+
+    def test_stored_availability(self):
+        """Test that slot availability follows visit changes"""
+        tomorrow = fields.Date.today() + timedelta(days=1)
+        while tomorrow.weekday() > 4:  # If it's weekend
+            tomorrow += timedelta(days=1)
+
+        slot = self.env['hr.hospital.physician.schedule'].create({
+            'physician_id': self.physician.id,
+            'appointment_date': tomorrow,
+            'appointment_time': 9.0
+        })
+        self.assertTrue(slot.is_available)
+        self.assertEqual(slot.active_visit_count, 0)
+
+        patient = self.env['hr.hospital.patient'].create({
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'gender': 'female',
+        })
+        visit = self.env['hr.hospital.patient.visits'].create({
+            'physician_id': self.physician.id,
+            'patient_id': patient.id,
+            'appointment_date': tomorrow,
+            'appointment_time': 9.0,
+        })
+        self.assertFalse(slot.is_available)
+        self.assertEqual(slot.active_visit_count, 1)
+        self.assertNotIn(slot, self.env['hr.hospital.physician.schedule'].search([
+            ('physician_id', '=', self.physician.id),
+            ('is_available', '=', True),
+        ]))
+
+        visit.action_cancel()
+        self.assertTrue(slot.is_available)
+        self.assertEqual(slot.active_visit_count, 0)
+
+    def test_appointment_minute(self):
+        """Test that slots and visits store their time as minute of day"""
+        tomorrow = fields.Date.today() + timedelta(days=1)
+        while tomorrow.weekday() > 4:  # If it's weekend
+            tomorrow += timedelta(days=1)
+
+        slot = self.env['hr.hospital.physician.schedule'].create({
+            'physician_id': self.physician.id,
+            'appointment_date': tomorrow,
+            'appointment_time': 13.5
+        })
+        self.assertEqual(slot.appointment_minute, 810)
+
+        patient = self.env['hr.hospital.patient'].create({
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'gender': 'female',
+        })
+        visit = self.env['hr.hospital.patient.visits'].create({
+            'physician_id': self.physician.id,
+            'patient_id': patient.id,
+            'appointment_date': tomorrow,
+            'appointment_time': 13.5,
+        })
+        self.assertEqual(visit.appointment_minute, 810)
+        self.assertEqual(visit.schedule_id, slot)
+
+        slot.appointment_time = 14.0
+        self.assertEqual(slot.appointment_minute, 840)
+        self.assertTrue(slot.is_available)
+
+    def test_missing_slots_keyed_by_minute(self):
+        """Test that existing slots are matched by minute, not float time"""
+        Schedule = self.env['hr.hospital.physician.schedule']
+        tomorrow = fields.Date.today() + timedelta(days=1)
+        while tomorrow.weekday() > 4:  # If it's weekend
+            tomorrow += timedelta(days=1)
+        Schedule.create({
+            'physician_id': self.physician.id,
+            'appointment_date': tomorrow,
+            'appointment_time': 10.0,
+        })
+
+        # 10:00 given with a float rounding error is the existing slot
+        created = Schedule._create_missing_slots(self.physician.id, [
+            (tomorrow, 10.0 + 1e-9),
+            (tomorrow, 10.5),
+        ])
+        self.assertEqual(created.mapped('appointment_minute'), [630])
+        self.assertEqual(Schedule.generate_slots(self.physician.id, tomorrow),
+                         18)
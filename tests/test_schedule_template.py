@@ -0,0 +1,184 @@
+from datetime import date, timedelta
+from odoo.tests import common
+from odoo.exceptions import ValidationError
+
+
+class TestScheduleTemplate(common.TransactionCase):
+    def _create_person(self, model, values):
+        """Helper method to create a person (patient or physician) with required fields."""
+        default_values = {
+            'name_first': 'Test',
+            'name_last': 'Person',
+            'gender': 'male',
+            'phone': '1234567890',
+            'email': 'test@example.com'
+        }
+        return self.env[model].create({**default_values, **values})
+
+    def setUp(self):
+        super().setUp()
+        # Mondays: mornings every week, afternoons on even weeks only
+        self.template = self.env['hr.hospital.schedule.template'].create({
+            'name': 'Monday Shifts',
+            'rule_ids': [
+                (0, 0, {
+                    'weekday': '0',
+                    'week_type': 'all',
+                    'time_from': 8.0,
+                    'time_to': 13.0,
+                }),
+                (0, 0, {
+                    'weekday': '0',
+                    'week_type': 'even',
+                    'time_from': 13.0,
+                    'time_to': 18.0,
+                }),
+            ],
+        })
+        self.physician = self._create_person('hr.hospital.physician', {
+            'name_first': 'Dr. John',
+            'name_last': 'Smith',
+            'is_intern': False,
+            'schedule_template_id': self.template.id,
+        })
+        self.patient = self._create_person('hr.hospital.patient', {
+            'name_first': 'Jane',
+            'name_last': 'Doe',
+            'date_of_birth': date(1990, 1, 1),
+        })
+
+        # Next Monday of an even ISO week
+        self.even_monday = date.today() + timedelta(days=1)
+        while self.even_monday.weekday() != 0 or \
+                self.even_monday.isocalendar()[1] % 2 != 0:
+            self.even_monday += timedelta(days=1)
+
+    def test_book_slot_rejected(self):
+        """Test that online booking rejects template-based physicians"""
+        result = self.env['hr.hospital.patient.visits'].book_slot(
+            self.physician.id, self.patient.id, self.even_monday, 9.0)
+
+        self.assertEqual(result['status'], 'invalid')
+        self.assertIn('schedule template', result['message'])
+        self.assertFalse(result['visit_id'])
+
+    def test_no_slots_materialized(self):
+        """Test that template-based physicians get no slot rows"""
+        slots = self.env['hr.hospital.physician.schedule'].search([
+            ('physician_id', '=', self.physician.id),
+        ])
+        self.assertFalse(slots)
+
+    def test_virtual_slots(self):
+        """Test expansion of weekly and even/odd week rules"""
+        odd_monday = self.even_monday + timedelta(days=7)
+        slot_keys = self.physician._get_virtual_slots(
+            self.even_monday, odd_monday + timedelta(days=6))
+
+        self.assertEqual(
+            len([k for k in slot_keys if k[0] == self.even_monday]), 20)
+        self.assertEqual(
+            len([k for k in slot_keys if k[0] == odd_monday]), 10)
+        self.assertEqual(len(slot_keys), 30)
+
+    def test_exceptions(self):
+        """Test that absences remove and extra hours add slots"""
+        tuesday = self.even_monday + timedelta(days=1)
+        self.env['hr.hospital.schedule.exception'].create([{
+            'physician_id': self.physician.id,
+            'exception_type': 'absence',
+            'date_from': self.even_monday,
+            'date_to': self.even_monday,
+            'time_from': 8.0,
+            'time_to': 10.0,
+        }, {
+            'physician_id': self.physician.id,
+            'exception_type': 'extra',
+            'date_from': tuesday,
+            'date_to': tuesday,
+            'time_from': 14.0,
+            'time_to': 15.0,
+        }])
+        slot_keys = self.physician._get_virtual_slots(
+            self.even_monday, tuesday)
+
+        self.assertNotIn((self.even_monday, 9.0), slot_keys)
+        self.assertIn((self.even_monday, 10.0), slot_keys)
+        self.assertIn((tuesday, 14.5), slot_keys)
+        self.assertEqual(len(slot_keys), 20 - 4 + 2)
+
+    def test_match_virtual_slots(self):
+        """Test matching slot keys against rules and exceptions in batch"""
+        tuesday = self.even_monday + timedelta(days=1)
+        odd_monday = self.even_monday + timedelta(days=7)
+        self.env['hr.hospital.schedule.exception'].create([{
+            'physician_id': self.physician.id,
+            'exception_type': 'absence',
+            'date_from': self.even_monday,
+            'date_to': self.even_monday,
+            'time_from': 8.0,
+            'time_to': 10.0,
+        }, {
+            'physician_id': self.physician.id,
+            'exception_type': 'extra',
+            'date_from': tuesday,
+            'date_to': tuesday,
+            'time_from': 14.0,
+            'time_to': 15.0,
+        }])
+        physician_id = self.physician.id
+        matched = self.env['hr.hospital.physician']._match_virtual_slots({
+            (physician_id, self.even_monday, 540),   # absence
+            (physician_id, self.even_monday, 600),   # weekly rule
+            (physician_id, self.even_monday, 900),   # even week rule
+            (physician_id, odd_monday, 900),         # not on odd weeks
+            (physician_id, tuesday, 870),            # extra hours
+            (physician_id, tuesday, 540),            # no rule
+        })
+
+        self.assertEqual(matched, {
+            (physician_id, self.even_monday, 600),
+            (physician_id, self.even_monday, 900),
+            (physician_id, tuesday, 870),
+        })
+
+    def test_visit_validated_against_rules(self):
+        """Test that visits are checked against the template rules"""
+        visit = self.env['hr.hospital.patient.visits'].create({
+            'physician_id': self.physician.id,
+            'patient_id': self.patient.id,
+            'appointment_date': self.even_monday,
+            'appointment_time': 15.0,
+        })
+        visit.action_schedule()
+        self.assertEqual(visit.state, 'scheduled')
+        self.assertNotIn(
+            (self.even_monday, 15.0),
+            self.physician._get_available_slots(
+                self.even_monday, self.even_monday))
+
+        # Tuesdays are not covered by the template
+        with self.assertRaises(ValidationError):
+            self.env['hr.hospital.patient.visits'].create({
+                'physician_id': self.physician.id,
+                'patient_id': self.patient.id,
+                'appointment_date': self.even_monday + timedelta(days=1),
+                'appointment_time': 9.0,
+            })
+
+    def test_rule_time_range_validation(self):
+        """Test working hour validation on rules"""
+        with self.assertRaises(ValidationError):
+            self.env['hr.hospital.schedule.template.rule'].create({
+                'template_id': self.template.id,
+                'weekday': '1',
+                'time_from': 12.0,
+                'time_to': 10.0,
+            })
+        with self.assertRaises(ValidationError):
+            self.env['hr.hospital.schedule.template.rule'].create({
+                'template_id': self.template.id,
+                'weekday': '1',
+                'time_from': 8.25,
+                'time_to': 10.0,
+            })
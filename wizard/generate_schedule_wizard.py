@@ -1,3 +1,4 @@
+from ast import literal_eval
 from datetime import timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
@@ -6,11 +7,29 @@ from odoo.exceptions import ValidationError
 class GenerateScheduleWizard(models.TransientModel):
     _name = 'hr.hospital.generate.schedule.wizard'
     _description = 'Generate Schedule Wizard'
-
+    _inherit = ['hr.hospital.shift.pattern.mixin']
+
+    mode = fields.Selection([
+        ('single', 'Single Physician'),
+        ('rollout', 'Roll-out to Many Physicians'),
+    ], default='single', required=True,
+        help='Roll-out queues one background job processing the selected '
+        'physicians one by one')
     physician_id = fields.Many2one(
         'hr.hospital.physician',
-        string='Physician',
-        required=True
+        string='Physician'
+    )
+    physician_ids = fields.Many2many(
+        'hr.hospital.physician',
+        'generate_schedule_wizard_physician_rel',
+        'wizard_id',
+        'physician_id',
+        string='Physicians',
+        domain=[('is_intern', '=', False)]
+    )
+    physician_domain = fields.Char(
+        string='Physician Filter',
+        help='Additional physicians to include in the roll-out'
     )
     date_from = fields.Date(
         string='From Date',
@@ -27,26 +46,6 @@ class GenerateScheduleWizard(models.TransientModel):
         help='If checked, existing slots in the date range will be removed '
         'before generating new ones'
     )
-    # Even week schedule
-    even_week_morning = fields.Boolean(
-        string='Even Week Morning (8:00-13:00)',
-        default=True,
-        help='Schedule for morning shifts (8:00-13:00) on even weeks'
-    )
-    even_week_afternoon = fields.Boolean(
-        string='Even Week Afternoon (13:00-18:00)',
-        help='Schedule for afternoon shifts (13:00-18:00) on even weeks'
-    )
-    # Odd week schedule
-    odd_week_morning = fields.Boolean(
-        string='Odd Week Morning (8:00-13:00)',
-        help='Schedule for morning shifts (8:00-13:00) on odd weeks'
-    )
-    odd_week_afternoon = fields.Boolean(
-        string='Odd Week Afternoon (13:00-18:00)',
-        default=True,
-        help='Schedule for afternoon shifts (13:00-18:00) on odd weeks'
-    )
 
     @api.onchange('date_from')
     def _onchange_date_from(self):
@@ -67,24 +66,21 @@ class GenerateScheduleWizard(models.TransientModel):
                 raise ValidationError(_(
                     'Cannot generate slots for past dates'))
 
-    def _get_time_slots(self, is_morning):
-        """Generate time slots for morning or afternoon shift."""
-        slots = []
-        if is_morning:
-            current_time = 8.0
-            end_time = 13.0
-        else:
-            current_time = 13.0
-            end_time = 18.0
-
-        while current_time < end_time:
-            slots.append(current_time)
-            current_time += 0.5
-        return slots
-
-    def _is_even_week(self, date):
-        """Check if the given date falls in an even week number."""
-        return date.isocalendar()[1] % 2 == 0
+    @api.constrains('mode', 'physician_id')
+    def _check_physician(self):
+        for record in self:
+            if record.mode == 'single' and not record.physician_id:
+                raise ValidationError(_('Please select a physician'))
+
+    def _get_rollout_physicians(self):
+        """Resolve the selected physicians, leaving out interns."""
+        self.ensure_one()
+        Physician = self.env['hr.hospital.physician']
+        physicians = self.physician_ids
+        if self.physician_domain:
+            physicians |= Physician.search(
+                literal_eval(self.physician_domain))
+        return physicians.filtered(lambda p: not p.is_intern)
 
     def action_generate_slots(self):
         self.ensure_one()
@@ -95,59 +91,18 @@ class GenerateScheduleWizard(models.TransientModel):
         if self.physician_id.is_intern:
             raise ValidationError(_('Cannot generate schedule for interns'))
 
-        # Clear existing slots if requested
+        # Clear existing slots if requested, as a single delete
         if self.clear_existing:
-            existing_slots = Schedule.search([
+            Schedule.search([
                 ('physician_id', '=', self.physician_id.id),
                 ('appointment_date', '>=', self.date_from),
                 ('appointment_date', '<=', self.date_to),
-            ])
-            existing_slots.unlink()
-
-        # Generate slots for each day
-        current_date = self.date_from
-        slots_created = 0
-
-        while current_date <= self.date_to:
-            # Skip weekends
-            if current_date.weekday() <= 4:  # Monday to Friday
-                is_even = self._is_even_week(current_date)
-
-                # Morning shift
-                if (is_even and self.even_week_morning) or \
-                   (not is_even and self.odd_week_morning):
-                    morning_slots = self._get_time_slots(True)
-                    for time_slot in morning_slots:
-                        if not Schedule.search([
-                            ('physician_id', '=', self.physician_id.id),
-                            ('appointment_date', '=', current_date),
-                            ('appointment_time', '=', time_slot)
-                        ], limit=1):
-                            Schedule.create({
-                                'physician_id': self.physician_id.id,
-                                'appointment_date': current_date,
-                                'appointment_time': time_slot
-                            })
-                            slots_created += 1
-
-                # Afternoon shift
-                if (is_even and self.even_week_afternoon) or \
-                   (not is_even and self.odd_week_afternoon):
-                    afternoon_slots = self._get_time_slots(False)
-                    for time_slot in afternoon_slots:
-                        if not Schedule.search([
-                            ('physician_id', '=', self.physician_id.id),
-                            ('appointment_date', '=', current_date),
-                            ('appointment_time', '=', time_slot)
-                        ], limit=1):
-                            Schedule.create({
-                                'physician_id': self.physician_id.id,
-                                'appointment_date': current_date,
-                                'appointment_time': time_slot
-                            })
-                            slots_created += 1
-
-            current_date += timedelta(days=1)
+            ]).unlink()
+
+        # Insert every missing slot of the pattern in one batch
+        slots_created = len(Schedule._create_missing_slots(
+            self.physician_id.id,
+            self._get_pattern_slot_keys(self.date_from, self.date_to)))
 
         # Show success message
         message = _(
@@ -168,3 +123,37 @@ class GenerateScheduleWizard(models.TransientModel):
                 }
             }
         }
+
+    def action_start_rollout(self):
+        """Queue a background roll-out job for the selected physicians."""
+        self.ensure_one()
+        physicians = self._get_rollout_physicians()
+        if not physicians:
+            raise ValidationError(_(
+                'No non-intern physicians selected for the roll-out'))
+
+        rollout = self.env['hr.hospital.schedule.rollout'].create({
+            'name': _('Schedule %(date_from)s - %(date_to)s') % {
+                'date_from': self.date_from,
+                'date_to': self.date_to,
+            },
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'clear_existing': self.clear_existing,
+            'even_week_morning': self.even_week_morning,
+            'even_week_afternoon': self.even_week_afternoon,
+            'odd_week_morning': self.odd_week_morning,
+            'odd_week_afternoon': self.odd_week_afternoon,
+            'line_ids': [(0, 0, {
+                'physician_id': physician.id,
+            }) for physician in physicians],
+        })
+        self.env.ref('hr_hospital.ir_cron_schedule_rollout')._trigger()
+
+        return {
+            'name': _('Schedule Roll-out'),
+            'view_mode': 'form',
+            'res_model': 'hr.hospital.schedule.rollout',
+            'res_id': rollout.id,
+            'type': 'ir.actions.act_window',
+        }
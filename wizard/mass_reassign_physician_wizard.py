@@ -27,17 +27,10 @@ class MassReassignPhysicianWizard(models.TransientModel):
         if not self.patient_ids:
             raise ValidationError(_("No patients selected for reassignment."))
 
-        for patient in self.patient_ids:
-            # Create history record for the change
-            self.env['hr.hospital.physician.change.history'].create({
-                'patient_id': patient.id,
-                'physician_id': self.physician_id.id,
-                'date_established': fields.Datetime.now(),
-            })
-
-            # Update patient's physician
-            patient.write({
-                'personal_physician': self.physician_id.id
-            })
+        # Update all patients at once, the change history is recorded
+        # by the patient write for those whose physician changes
+        self.patient_ids.write({
+            'personal_physician': self.physician_id.id
+        })
 
         return {'type': 'ir.actions.act_window_close'}
@@ -1,6 +1,8 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+from ..models.time_validation_mixin import time_to_minute
+
 
 class RescheduleAppointmentWizard(models.TransientModel):
     _name = 'hr.hospital.reschedule.appointment.wizard'
@@ -50,11 +52,15 @@ class RescheduleAppointmentWizard(models.TransientModel):
 
     def _ensure_schedule_slot(self):
         """Ensure schedule slot exists for the selected time."""
+        # Template-based schedules have no slot rows to create
+        if self.physician_id.schedule_template_id:
+            return self.physician_id._has_schedule_slot(self.date, self.time)
+
         Schedule = self.env['hr.hospital.physician.schedule']
         slot = Schedule.search([
             ('physician_id', '=', self.physician_id.id),
             ('appointment_date', '=', self.date),
-            ('appointment_time', '=', self.time)
+            ('appointment_minute', '=', time_to_minute(self.time))
         ], limit=1)
 
         # Only create slots on weekdays
@@ -79,14 +85,17 @@ class RescheduleAppointmentWizard(models.TransientModel):
         if not active_id:
             return None
 
-        # Check if the new time slot is available
-        conflicting_visits = self.env['hr.hospital.patient.visits'].search([
-            ('physician_id', '=', self.physician_id.id),
-            ('appointment_date', '=', self.date),
-            ('appointment_time', '=', self.time),
-            ('state', 'not in', ['cancelled']),
-            ('id', '!=', active_id)
-        ])
+        # Check if the new time slot is available in the day bitmap,
+        # ignoring the visit being rescheduled
+        visit = self.env['hr.hospital.patient.visits'].browse(active_id)
+        is_own_slot = (
+            visit.state not in ('cancelled', 'no_show') and
+            visit.physician_id == self.physician_id and
+            visit.appointment_date == self.date and
+            visit.appointment_time == self.time
+        )
+        conflicting_visits = not is_own_slot and \
+            self.physician_id._is_slot_booked(self.date, self.time)
 
         if conflicting_visits:
             return {
@@ -127,9 +136,9 @@ class RescheduleAppointmentWizard(models.TransientModel):
             'state': 'cancelled'
         })
 
-        # Create new appointment with SQL to bypass validations
+        # Cancelled visits no longer hold their slot, so the new
+        # appointment goes through the regular booking validation
         new_visit = self.env['hr.hospital.patient.visits'].sudo().with_context(
-            skip_schedule_validation=True,  # Add context to skip validations
             mail_create_nosubscribe=True    # Prevent sending notifications
         ).create({
             'physician_id': self.physician_id.id,